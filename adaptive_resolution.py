@@ -0,0 +1,167 @@
+import contextlib
+import json
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+from inference_backends import top_predictions
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOLUTION_REPORT_PATH = os.path.join(BASE_DIR, "resolution_report.json")
+
+POLICIES = ("load", "retry")
+
+# Per-thread record of whether a prediction was answered below full
+# resolution, so callers can keep degraded answers out of shared caches
+_reduced = threading.local()
+
+
+def variant_path(size, base_dir=BASE_DIR):
+    return os.path.join(base_dir, f"food_category_model_{size}.keras")
+
+
+def load_resolution_report(path=RESOLUTION_REPORT_PATH):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+@contextlib.contextmanager
+def track_reduced_resolution():
+    # state["reduced"] becomes True if any image classified by this thread
+    # inside the block was served below full resolution (by any wrapper depth)
+    state = {"reduced": False}
+    _reduced.state = state
+    try:
+        yield state
+    finally:
+        _reduced.state = None
+
+
+# ---------------- ADAPTIVE INPUT RESOLUTION ----------------
+# `variants` maps input side -> classifier for the same network exported at
+# that resolution (export_resolutions.py). Policies:
+#   load  - the busier this process is (concurrent predict calls against
+#           `busy_at`), the smaller the input it uses
+#   retry - start at the smallest input and re-run at the next size up while
+#           top-1 confidence is below `retry_confidence` percent
+
+class AdaptiveResolutionClassifier:
+    def __init__(self, variants, policy="load", busy_at=4, retry_confidence=60.0, latency=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown resolution policy '{policy}' (choose from {', '.join(POLICIES)})")
+
+        self.sizes = sorted(variants, reverse=True)
+        self.variants = variants
+        self.policy = policy
+        self.busy_at = max(1, int(busy_at))
+        self.retry_confidence = float(retry_confidence)
+        self.latency = latency
+
+        full = variants[self.sizes[0]]
+        for size in self.sizes[1:]:
+            if list(variants[size].class_names) != list(full.class_names):
+                raise ValueError(f"{size}px variant has different class labels")
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._served = Counter()
+        self._retries = 0
+
+    @property
+    def full(self):
+        return self.variants[self.sizes[0]]
+
+    @property
+    def class_names(self):
+        return self.full.class_names
+
+    @property
+    def version(self):
+        return f"adaptive-{self.policy}:{self.full.version}"
+
+    @property
+    def queue(self):
+        return self.full.queue
+
+    def _timed(self, size):
+        if self.latency is None:
+            return contextlib.nullcontext()
+        return self.latency.time(f"predict_{size}px")
+
+    def _run(self, size, images):
+        with self._timed(size):
+            return np.asarray(self.variants[size].predict(images), dtype="float32")
+
+    def _size_for_load(self, in_flight):
+        level = min(len(self.sizes) - 1, (in_flight - 1) * len(self.sizes) // self.busy_at)
+        return self.sizes[max(0, level)]
+
+    def predict(self, images):
+        images = list(images)
+        with self._lock:
+            self._in_flight += 1
+            in_flight = self._in_flight
+
+        try:
+            if self.policy == "load":
+                size = self._size_for_load(in_flight)
+                probs = self._run(size, images)
+                served = [size] * len(images)
+            else:
+                probs, served = self._predict_retry(images)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        with self._lock:
+            self._served.update(served)
+
+        state = getattr(_reduced, "state", None)
+        if state is not None and any(size != self.sizes[0] for size in served):
+            state["reduced"] = True
+        return probs
+
+    def _predict_retry(self, images):
+        ladder = self.sizes[::-1]
+        probs = self._run(ladder[0], images)
+        served = [ladder[0]] * len(images)
+
+        for size in ladder[1:]:
+            unsure = np.flatnonzero(probs.max(axis=1) * 100 < self.retry_confidence)
+            if not len(unsure):
+                break
+            probs[unsure] = self._run(size, [images[i] for i in unsure])
+            for i in unsure:
+                served[i] = size
+            with self._lock:
+                self._retries += len(unsure)
+
+        return probs, served
+
+    def classify(self, image, top_k=3):
+        return self.classify_many([image], top_k=top_k)[0]
+
+    def classify_many(self, images, top_k=3):
+        return [
+            top_predictions(probs, self.class_names, top_k)
+            for probs in self.predict(images)
+        ]
+
+    def close(self):
+        for classifier in self.variants.values():
+            classifier.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "sizes": list(self.sizes),
+                "served": {size: self._served[size] for size in self.sizes},
+                "retries": self._retries,
+                "in_flight": self._in_flight,
+            }
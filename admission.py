@@ -0,0 +1,57 @@
+import threading
+from collections import Counter
+
+
+# ---------------- ADMISSION CONTROL ----------------
+# At most `max_concurrent` analyses run and `max_queued` more may wait; past
+# that, or when the shared inference queue already holds `max_queue_depth`
+# images, new requests are refused so the caller can degrade (cached result,
+# lighter model, manual selection) instead of adding to everyone's latency.
+
+class AdmissionController:
+    def __init__(self, max_concurrent=4, max_queued=8, max_queue_depth=64):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queued = max(0, int(max_queued))
+        self.max_queue_depth = max(1, int(max_queue_depth))
+
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._peak = 0
+        self._outcomes = Counter()
+
+    @property
+    def limit(self):
+        return self.max_concurrent + self.max_queued
+
+    def try_acquire(self, queue_depth=0):
+        with self._lock:
+            if self._outstanding >= self.limit or queue_depth >= self.max_queue_depth:
+                return False
+            self._outstanding += 1
+            self._peak = max(self._peak, self._outstanding)
+            self._outcomes["admitted"] += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._outstanding = max(0, self._outstanding - 1)
+
+    def record(self, outcome):
+        # outcome: "cache", "fast_model" (degraded) or "shed"
+        with self._lock:
+            self._outcomes[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "outstanding": self._outstanding,
+                "peak_outstanding": self._peak,
+                "limit": self.limit,
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": self._outcomes["admitted"],
+                "degraded_cache": self._outcomes["cache"],
+                "degraded_fast_model": self._outcomes["fast_model"],
+                "shed": self._outcomes["shed"],
+            }
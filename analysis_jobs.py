@@ -0,0 +1,58 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+# ---------------- BACKGROUND ANALYSIS JOBS ----------------
+# The Analyze buttons hand their work to this pool and return straight away,
+# so a slow prediction never holds the session's script thread. Each job gets
+# a `cancelled` callable to check between stages; cancel() also drops jobs
+# that have not started yet.
+
+class AnalysisJob:
+    def __init__(self, future, cancel_event):
+        self.future = future
+        self._cancel_event = cancel_event
+        self.started = time.monotonic()
+
+    def cancel(self):
+        self._cancel_event.set()
+        self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self.future.done()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def error(self):
+        if not self.future.done() or self.future.cancelled():
+            return None
+        return self.future.exception()
+
+    def result(self):
+        return self.future.result()
+
+
+class AnalysisRunner:
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)),
+            thread_name_prefix="analysis"
+        )
+
+    def submit(self, fn, *args):
+        cancel_event = threading.Event()
+        future = self._pool.submit(self._run, fn, args, cancel_event)
+        return AnalysisJob(future, cancel_event)
+
+    @staticmethod
+    def _run(fn, args, cancel_event):
+        if cancel_event.is_set():
+            raise CancelledError()
+        return fn(*args, cancelled=cancel_event.is_set)
@@ -3,20 +3,51 @@
 # WITH LOGIN, PERSONALIZATION & WEEKLY REPORT
 # =========================================================
 
+import io
 import os
 import streamlit as st
 import numpy as np
 import pandas as pd
-import json
-import cv2
-from PIL import Image
-import tensorflow as tf
-from tensorflow.keras import backend as K
 import sqlite3
 import datetime
+import threading
+import time
 import bcrypt
-import plotly.express as px
+from concurrent.futures import ThreadPoolExecutor
 import streamlit.components.v1 as components
+# Heavy ML libraries (TensorFlow, OpenCV, ONNX Runtime) are imported lazily
+# by the inference backends, so the login page never pays for them
+from host_profile import apply_host_profile_env, backend_options, load_host_profile
+from image_io import load_image
+from adaptive_resolution import (
+    AdaptiveResolutionClassifier,
+    load_resolution_report,
+    track_reduced_resolution,
+    variant_path,
+)
+from admission import AdmissionController
+from analysis_jobs import AnalysisRunner
+from cascade import CascadeClassifier, CascadeLog
+from dataset_export import KEEP_ARCHIVES, MAX_ARCHIVE_AGE_DAYS, ExportManager
+from inference_backends import FoodClassifier, load_backend, load_class_names
+from inference_server import RemoteClassifier
+from latency_stats import LatencyTracker
+from model_registry import (
+    REGISTRY_DIR,
+    RegistryClassifier,
+    ShadowLog,
+    candidate_version,
+    current_version,
+    list_versions,
+    promote,
+    set_candidate
+)
+from model_utils import IMG_SIZE
+from multi_food import detect_foods
+from prediction_cache import PredictionCache, image_key
+from sample_shards import ShardWriter
+from similarity_index import SimilarityIndex
+from training_data import dedup_stats, save_training_image
 
 # ---------------- COMMON FOODS & EXERCISE DATA ----------------
 COMMON_FOODS = {
@@ -38,6 +69,80 @@ MODEL_PATH = os.path.join(BASE_DIR, "food_category_model.keras")
 LABELS_PATH = os.path.join(BASE_DIR, "class_labels.json")
 CALORIES_PATH = os.path.join(BASE_DIR, "food_calories.csv")
 
+# Per-host thread / oneDNN / batch-size profile written by autotune.py;
+# explicit environment variables below still take precedence
+HOST_PROFILE = load_host_profile()
+apply_host_profile_env(HOST_PROFILE)
+
+# Inference backend ("keras", "tflite" or "onnx") and the model file it
+# serves; the path defaults to the standard artifact for that backend
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras")
+INFERENCE_MODEL_PATH = os.environ.get("INFERENCE_MODEL_PATH") or None
+
+# Shared inference queue: largest batch per forward pass and how long the
+# first request waits for others to join it
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", HOST_PROFILE.get("batch_size", 16)))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "5"))
+
+# After a failed background warm-up, seconds before reruns may try again
+MODEL_WARMUP_RETRY_SECONDS = float(os.environ.get("MODEL_WARMUP_RETRY_SECONDS", "300"))
+
+# Unix socket of a shared inference daemon (inference_server.py); when set,
+# predictions go to the daemon and the model is only loaded in-process if
+# the daemon is down
+INFERENCE_SOCKET = os.environ.get("INFERENCE_SOCKET", "")
+
+# Versioned models (model_registry.py): the CURRENT version is served and
+# picked up without a restart; pointers are re-checked this often. With an
+# empty registry the INFERENCE_BACKEND/INFERENCE_MODEL_PATH model is served.
+MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", REGISTRY_DIR)
+MODEL_REGISTRY_CHECK_SECONDS = float(os.environ.get("MODEL_REGISTRY_CHECK_SECONDS", "5"))
+
+# Optional two-stage cascade: a small, fast model (e.g. the quantized
+# "tflite" variant) answers first and images whose top-1 confidence is below
+# CASCADE_THRESHOLD percent escalate to the full model. Empty = disabled.
+CASCADE_FAST_BACKEND = os.environ.get("CASCADE_FAST_BACKEND", "")
+CASCADE_FAST_MODEL_PATH = os.environ.get("CASCADE_FAST_MODEL_PATH") or None
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", "80"))
+
+# Adaptive input resolution for the default keras model: "load" shrinks the
+# input as concurrent predictions pile up, "retry" starts small and re-runs
+# larger while unsure. Empty = always 224px. Variants come from
+# export_resolutions.py; sizes without an exported file are ignored.
+ADAPTIVE_RESOLUTION = os.environ.get("ADAPTIVE_RESOLUTION", "")
+ADAPTIVE_RESOLUTION_SIZES = [
+    int(size) for size in os.environ.get("ADAPTIVE_RESOLUTION_SIZES", "160,128").split(",") if size
+]
+ADAPTIVE_RETRY_CONFIDENCE = float(os.environ.get("ADAPTIVE_RETRY_CONFIDENCE", "60"))
+
+# Background analysis: worker threads shared by all sessions and how often a
+# waiting page checks for its result
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "4"))
+ANALYSIS_POLL_SECONDS = float(os.environ.get("ANALYSIS_POLL_SECONDS", "0.5"))
+
+# Admission control: analyses allowed to wait beyond the running ones, and
+# the shared inference queue depth (images) at which new requests degrade
+ANALYSIS_MAX_QUEUED = int(os.environ.get("ANALYSIS_MAX_QUEUED", "8"))
+INFERENCE_MAX_QUEUE_DEPTH = int(os.environ.get("INFERENCE_MAX_QUEUE_DEPTH", "64"))
+
+# Batch upload: most photos per batch and threads decoding them. Capped at
+# the inference queue's batch size so a whole upload fits in one forward pass
+BATCH_UPLOAD_MAX_FILES = min(
+    int(os.environ.get("BATCH_UPLOAD_MAX_FILES", INFERENCE_MAX_BATCH_SIZE)),
+    INFERENCE_MAX_BATCH_SIZE
+)
+BATCH_DECODE_WORKERS = int(os.environ.get("BATCH_DECODE_WORKERS", "4"))
+
+# Number of analysed images whose top-3 results are kept across sessions
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "1024"))
+
+# Opt-in: the classifier also returns its penultimate-layer features (same
+# forward pass, same queue/daemon) to power "you logged something like this"
+SIMILAR_MEALS = os.environ.get("SIMILAR_MEALS", "0") == "1"
+
+# Cosine similarity above which a past log counts as "something like this"
+SIMILAR_MEAL_THRESHOLD = float(os.environ.get("SIMILAR_MEAL_THRESHOLD", "0.9"))
+
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(
     page_title="DESIGNING FOOD CALORIE ESTIMATION AND FITNESS RECOMMENDATION SYSTEM BASED ON USER INFORMATION",
@@ -111,6 +216,22 @@ CREATE TABLE IF NOT EXISTS user_activity (
 )
 """)
 
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS training_images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT UNIQUE,
+    label TEXT,
+    size_bytes INTEGER,
+    phash TEXT,
+    source TEXT,
+    username TEXT,
+    created_at TEXT
+)
+""")
+cursor.execute("""
+CREATE INDEX IF NOT EXISTS idx_training_images_label
+ON training_images (label)
+""")
 
 conn.commit()
 
@@ -127,11 +248,6 @@ def hash_password(password):
 def check_password(password, hashed):
     return bcrypt.checkpw(password.encode('utf-8'), hashed)
 
-def preprocess_image(image):
-    image = cv2.resize(image, (224, 224))
-    image = image.astype("float32") / 255.0
-    return np.expand_dims(image, axis=0)
-
 def bmi_calc(weight, height_cm):
     h = height_cm / 100
     return weight / (h ** 2)
@@ -232,11 +348,12 @@ def suggest_exercises(total_calories):
     st.markdown("### 🏃 Exercise Recommendation to Burn This Meal")
 
     # Get user weight
-    cursor.execute(
-        "SELECT weight FROM users WHERE username=?",
-        (st.session_state.username,)
-    )
-    user_weight = cursor.fetchone()[0]
+    with latency.time("exercise_query"):
+        cursor.execute(
+            "SELECT weight FROM users WHERE username=?",
+            (st.session_state.username,)
+        )
+        user_weight = cursor.fetchone()[0]
 
     # MET values
     EXERCISE_MET = {
@@ -277,32 +394,448 @@ exercise_map = {
 
 
 # ---------------- LOAD MODEL ----------------
+# Nothing is loaded at startup: the first page that needs the classifier
+# loads it, and warm_up_model() preloads it in the background after login.
+
 @st.cache_resource
-def load_model():
-    K.clear_session()
-    return tf.keras.models.load_model(
-        MODEL_PATH,
-        compile=False
+def get_model_status():
+    return {"model": None, "error": None, "warming": False, "failed_at": None}
+
+def build_classifier(entry, shadow=False):
+    # entry: a model_registry.resolve() dict, or None for the default model
+    if entry is None:
+        backend, model_path, labels_path = INFERENCE_BACKEND, INFERENCE_MODEL_PATH, LABELS_PATH
+    else:
+        backend, model_path, labels_path = entry["backend"], entry["model_path"], entry["labels_path"]
+
+    def classifier_for(path):
+        return FoodClassifier(
+            load_backend(backend, path, **backend_options(HOST_PROFILE, backend)),
+            load_class_names(labels_path),
+            max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=INFERENCE_MAX_WAIT_MS,
+            latency=None if shadow else latency,
+            with_features=SIMILAR_MEALS and not shadow
+        )
+
+    classifier = classifier_for(model_path)
+
+    if ADAPTIVE_RESOLUTION and entry is None and backend == "keras":
+        variants = {classifier.backend.input_size: classifier}
+        for size in ADAPTIVE_RESOLUTION_SIZES:
+            if os.path.exists(variant_path(size)):
+                variants[size] = classifier_for(variant_path(size))
+        if len(variants) > 1:
+            classifier = AdaptiveResolutionClassifier(
+                variants,
+                policy=ADAPTIVE_RESOLUTION,
+                busy_at=ANALYSIS_WORKERS,
+                retry_confidence=ADAPTIVE_RETRY_CONFIDENCE,
+                latency=None if shadow else latency
+            )
+
+    return classifier
+
+@st.cache_resource
+def load_shadow_log():
+    return ShadowLog("users.db")
+
+@st.cache_resource
+def load_local_model():
+    return RegistryClassifier(
+        build_classifier,
+        registry_dir=MODEL_REGISTRY_DIR,
+        check_every=MODEL_REGISTRY_CHECK_SECONDS,
+        shadow_log=load_shadow_log()
     )
 
-try:
-    model = load_model()
-except Exception as e:
-    model = None
-    st.error("⚠️ Model could not be loaded.")
-    st.text(str(e))
+@st.cache_resource
+def load_cascade_log():
+    return CascadeLog("users.db")
+
+@st.cache_resource
+def load_model():
+    status = get_model_status()
+    try:
+        if INFERENCE_SOCKET:
+            classifier = RemoteClassifier(
+                INFERENCE_SOCKET,
+                fallback=load_local_model,
+                latency=latency
+            )
+        else:
+            classifier = load_local_model()
+
+        if CASCADE_FAST_BACKEND:
+            fast = FoodClassifier(
+                load_backend(
+                    CASCADE_FAST_BACKEND,
+                    CASCADE_FAST_MODEL_PATH,
+                    **backend_options(HOST_PROFILE, CASCADE_FAST_BACKEND)
+                ),
+                load_class_names(LABELS_PATH),
+                max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+                max_wait_ms=INFERENCE_MAX_WAIT_MS
+            )
+            classifier = CascadeClassifier(
+                fast,
+                classifier,
+                threshold=CASCADE_THRESHOLD,
+                log=load_cascade_log(),
+                latency=latency
+            )
+    except Exception as e:
+        status["error"] = str(e)
+        raise
+
+    status["model"] = classifier
+    status["error"] = None
+    return classifier
+
+def serving_classifier(classifier):
+    # Unwrap the cascade / registry wrappers to the model answering requests
+    if isinstance(classifier, CascadeClassifier):
+        classifier = classifier.full
+    if isinstance(classifier, RegistryClassifier):
+        classifier = classifier.live
+    return classifier
+
+def warm_up_model():
+    status = get_model_status()
+    if status["model"] is not None or status["warming"]:
+        return
+    # A failed load is not retried on every rerun, only after a back-off
+    if status["failed_at"] is not None and \
+            time.monotonic() - status["failed_at"] < MODEL_WARMUP_RETRY_SECONDS:
+        return
+    status["warming"] = True
+
+    def run():
+        # Dummy forward pass so graph tracing happens before the first real click
+        try:
+            load_model().classify(np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype="uint8"))
+            status["failed_at"] = None
+        except Exception as e:
+            status["error"] = str(e)
+            status["failed_at"] = time.monotonic()
+        finally:
+            status["warming"] = False
+
+    threading.Thread(target=run, name="model-warmup", daemon=True).start()
+
+@st.cache_resource
+def get_prediction_cache():
+    return PredictionCache(max_entries=PREDICTION_CACHE_SIZE)
 
-# ---------------- LOAD LABELS & CALORIE DATA ----------------
-with open(LABELS_PATH, "r") as f:
-    class_indices = json.load(f)
+@st.cache_resource
+def get_latency_tracker():
+    return LatencyTracker()
 
-# Reverse mapping: index → class name
-class_names = {v: k for k, v in class_indices.items()}
+prediction_cache = get_prediction_cache()
+latency = get_latency_tracker()
 
-# Load calorie CSV
+# ---------------- LOAD CALORIE DATA ----------------
 calorie_df = pd.read_csv(CALORIES_PATH)
 
 
+def predict_top3(image):
+    key = image_key(image, model.version)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    # Answers from a reduced-resolution pass are not cached: they would keep
+    # being served after the load that caused them has passed
+    with track_reduced_resolution() as resolution:
+        top_results = model.classify(image, top_k=3)
+    if not resolution["reduced"]:
+        prediction_cache.put(key, tuple(top_results))
+    return top_results
+
+def predict_top3_many(images):
+    # Cache misses go to the model together as one batch
+    keys = [image_key(image, model.version) for image in images]
+    results = [prediction_cache.get(key) for key in keys]
+    missing = [i for i, cached in enumerate(results) if cached is None]
+
+    if missing:
+        with track_reduced_resolution() as resolution:
+            fresh = model.classify_many([images[i] for i in missing], top_k=3)
+        for i, top_results in zip(missing, fresh):
+            if not resolution["reduced"]:
+                prediction_cache.put(keys[i], tuple(top_results))
+            results[i] = top_results
+
+    return [list(r) for r in results]
+
+
+# ---------------- SIMILAR MEALS ----------------
+@st.cache_resource
+def get_similarity_index():
+    return SimilarityIndex()
+
+def show_similar_meals(embedding):
+    if embedding is None:
+        return
+
+    matches = get_similarity_index().query(
+        embedding,
+        k=1,
+        min_similarity=SIMILAR_MEAL_THRESHOLD,
+        where=lambda meta: meta.get("username") == st.session_state.username
+        and meta.get("calories") is not None
+    )
+
+    for _, meta in matches:
+        st.info(
+            f"🔁 You logged something like this before: **{meta['label']}** "
+            f"({meta['calories']:.0f} kcal) on {meta['date']}"
+        )
+
+# ---------------- DATASET EXPORT ----------------
+@st.cache_resource
+def get_export_manager():
+    return ExportManager("users.db")
+
+# ---------------- TRAINING SHARDS ----------------
+@st.cache_resource
+def get_shard_writer():
+    return ShardWriter()
+
+def append_training_sample(image, food, top_results):
+    # Pre-resized copy for training/evaluation; the JPEG stays the archive
+    class_names = model.class_names
+    predicted, confidence = top_results[0]
+
+    get_shard_writer().append(
+        image,
+        class_names.index(food) if food in class_names else -1,
+        class_names.index(predicted) if predicted in class_names else -1,
+        confidence / 100
+    )
+
+def record_cascade_feedback(image, food):
+    # The confirmed label is the ground truth for per-stage cascade accuracy
+    if isinstance(model, CascadeClassifier):
+        model.confirm(image, food)
+
+def index_logged_image(embedding, saved, food, calories, date):
+    # saved: save_training_image() result; a near-duplicate photo is already
+    # represented in the index by the image it duplicates
+    if embedding is None or saved["duplicate"]:
+        return
+
+    get_similarity_index().add_one(embedding, {
+        "path": saved["path"],
+        "label": food,
+        "calories": calories,
+        "username": st.session_state.username,
+        "date": date,
+    })
+
+
+# ---------------- BACKGROUND ANALYSIS ----------------
+# Analyze buttons start a job and return; a polling fragment picks up the
+# result, so the rest of the page stays usable while the model runs.
+
+@st.cache_resource
+def get_analysis_runner():
+    return AnalysisRunner(max_workers=ANALYSIS_WORKERS)
+
+@st.cache_resource
+def get_admission_controller():
+    return AdmissionController(
+        max_concurrent=ANALYSIS_WORKERS,
+        max_queued=ANALYSIS_MAX_QUEUED,
+        max_queue_depth=INFERENCE_MAX_QUEUE_DEPTH
+    )
+
+def analyze_single(image, cancelled):
+    # The embedding comes out of the same forward pass as the prediction;
+    # models or wrappers without features just skip similar-meal hints
+    if not SIMILAR_MEALS or not hasattr(model, "classify_with_embedding"):
+        return predict_top3(image), None
+
+    with track_reduced_resolution() as resolution:
+        top_results, embedding = model.classify_with_embedding(image, top_k=3)
+    if not resolution["reduced"]:
+        prediction_cache.put(image_key(image, model.version), tuple(top_results))
+    return top_results, embedding
+
+def analyze_plate(image, cancelled):
+    return detect_foods(model, image)
+
+# Overload fallbacks: (outcome, result) or None when nothing cheaper exists
+def degrade_single(image):
+    cached = prediction_cache.get(image_key(image, model.version))
+    if cached is not None:
+        return "cache", (list(cached), None)
+    if isinstance(model, CascadeClassifier):
+        return "fast_model", (model.fast.classify(image, top_k=3), None)
+    return None
+
+def degrade_plate(image):
+    if isinstance(model, CascadeClassifier):
+        return "fast_model", detect_foods(model.fast, image)
+    return None
+
+DEGRADED_NOTICES = {
+    "cache": "⚡ The AI model is busy right now – showing the saved result for this photo.",
+    "fast_model": "⚡ The AI model is busy right now – showing a quick estimate from the lighter model. Please double-check it.",
+    "shed": "🚦 The AI model is overloaded right now. Please try again in a moment, or pick the food yourself in 📝 Select Manually.",
+}
+
+def queue_depth():
+    try:
+        return model.queue.depth()
+    except Exception:
+        return 0
+
+def start_analysis(slot, fn, image, on_result, degrade=None):
+    cancel_analysis(slot)
+
+    admission = get_admission_controller()
+    if not admission.try_acquire(queue_depth()):
+        fallback = degrade(image) if degrade is not None else None
+        if fallback is None:
+            admission.record("shed")
+            st.session_state.analysis_notices[slot] = "shed"
+        else:
+            outcome, result = fallback
+            admission.record(outcome)
+            st.session_state.analysis_notices[slot] = outcome
+            on_result(result)
+        return
+
+    job = get_analysis_runner().submit(fn, image)
+    job.future.add_done_callback(lambda _: admission.release())
+    st.session_state.analysis_jobs[slot] = job
+
+def cancel_analysis(slot):
+    st.session_state.analysis_notices.pop(slot, None)
+    job = st.session_state.analysis_jobs.pop(slot, None)
+    if job is not None:
+        job.cancel()
+
+def switch_to_manual():
+    st.session_state.analyze_mode = "📝 Select Manually"
+
+def show_analysis_notice(slot):
+    notice = st.session_state.analysis_notices.get(slot)
+    if notice is None:
+        return
+
+    if notice == "shed":
+        st.warning(DEGRADED_NOTICES[notice])
+        st.button("📝 Select Manually", key=f"manual_{slot}", on_click=switch_to_manual)
+    else:
+        st.info(DEGRADED_NOTICES[notice])
+
+def analysis_pending(slot):
+    job = st.session_state.analysis_jobs.get(slot)
+    return job is not None and job.error is None
+
+def apply_single_result(result):
+    st.session_state.top_results, st.session_state.current_embedding = result
+    st.session_state.analysis_done = True
+
+def apply_plate_result(result):
+    st.session_state.plate_results = result
+
+def analyze_batch(files, cancelled):
+    def decode(file):
+        name, data = file
+        try:
+            return name, load_image(io.BytesIO(data)), None
+        except Exception as e:
+            return name, None, str(e)
+
+    with latency.time("batch_decode"):
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_DECODE_WORKERS, len(files)))) as pool:
+            decoded = list(pool.map(decode, files))
+
+    if cancelled():
+        return None
+
+    ok = [(name, image) for name, image, error in decoded if error is None]
+    errors = [(name, error) for name, _, error in decoded if error is not None]
+    top_results = predict_top3_many([image for _, image in ok]) if ok else []
+
+    return {
+        "names": [name for name, _ in ok],
+        "images": [image for _, image in ok],
+        "top_results": top_results,
+        "errors": errors,
+    }
+
+def batch_calories(rows):
+    per_100g = dict(zip(calorie_df["category"], calorie_df["calories_per_100g"].astype(float)))
+    return [
+        round(per_100g.get(food, 0.0) / 100 * (0.0 if pd.isna(grams) else float(grams)), 1)
+        for food, grams in zip(rows["Food"], rows["Grams"])
+    ]
+
+def apply_batch_result(result):
+    rows = pd.DataFrame({
+        "Log": True,
+        "Photo": result["names"],
+        "Food": [top[0][0] for top in result["top_results"]],
+        "AI Confidence": [round(top[0][1], 1) for top in result["top_results"]],
+        "Grams": 100,
+    })
+    rows["Calories"] = batch_calories(rows)
+
+    st.session_state.batch_images = result["images"]
+    st.session_state.batch_rows = rows
+    st.session_state.batch_errors = result["errors"]
+
+def apply_batch_edits():
+    # Fold the editor's changes into the table so calories stay in sync
+    editor_key = f"batch_editor_{st.session_state.batch_editor_version}"
+    rows = st.session_state.batch_rows.copy()
+    for index, changes in st.session_state[editor_key]["edited_rows"].items():
+        for column, value in changes.items():
+            rows.at[int(index), column] = value
+    rows["Grams"] = rows["Grams"].fillna(0)
+    rows["Calories"] = batch_calories(rows)
+
+    st.session_state.batch_rows = rows
+    st.session_state.batch_editor_version += 1
+
+def clear_batch():
+    cancel_analysis("batch")
+    st.session_state.batch_images = None
+    st.session_state.batch_rows = None
+    st.session_state.batch_errors = []
+    st.session_state.uploader_key += 1
+
+def poll_analysis(slot, on_result, message):
+    job = st.session_state.analysis_jobs.get(slot)
+    if job is None:
+        return
+
+    if job.error is not None:
+        st.error(f"⚠️ Analysis failed: {job.error}")
+        return
+
+    @st.fragment(run_every=ANALYSIS_POLL_SECONDS)
+    def poll():
+        job = st.session_state.analysis_jobs.get(slot)
+        if job is None:
+            return
+
+        if not job.done():
+            st.info(f"⏳ {message} ({job.elapsed():.0f}s)")
+            return
+
+        if job.error is None:
+            del st.session_state.analysis_jobs[slot]
+            on_result(job.result())
+        st.rerun()
+
+    poll()
+
+
 
 # ---------------- SESSION STATE ----------------
 if "logged_in" not in st.session_state:
@@ -758,6 +1291,7 @@ if not st.session_state.get("logged_in", False):
     st.markdown('</div>', unsafe_allow_html=True)
     st.stop()
 
+warm_up_model()
 
 if "page" not in st.session_state:
     st.session_state.page = "🏠 Home"
@@ -974,8 +1508,12 @@ elif st.session_state.page == "📷 Analyze Food":
     st.markdown("---")
 
     # ---------------- SAFETY CHECK ----------------
-    if model is None:
+    try:
+        with st.spinner("Loading AI model..."):
+            model = load_model()
+    except Exception as e:
         st.error("⚠️ AI model not loaded. Please restart the application.")
+        st.text(str(e))
         st.stop()
 
     # ---------------- SESSION INIT ----------------
@@ -991,11 +1529,21 @@ elif st.session_state.page == "📷 Analyze Food":
     if "selected_food" not in st.session_state:
         st.session_state.selected_food = None
 
+    if "current_embedding" not in st.session_state:
+        st.session_state.current_embedding = None
+
+    if "analysis_jobs" not in st.session_state:
+        st.session_state.analysis_jobs = {}
+
+    if "analysis_notices" not in st.session_state:
+        st.session_state.analysis_notices = {}
+
     # ---------------- MODE SELECT ----------------
     mode = st.radio(
         "Choose Input Method:",
-        ["📷 Upload Image", "📸 Use Camera", "📝 Select Manually"],
-        horizontal=True
+        ["📷 Upload Image", "📸 Use Camera", "🍱 Multi-Food Plate", "🗂 Batch Upload", "📝 Select Manually"],
+        horizontal=True,
+        key="analyze_mode"
     )
 
     # =====================================================
@@ -1010,7 +1558,11 @@ elif st.session_state.page == "📷 Analyze Food":
         )
 
         if uploaded_file and st.session_state.current_image is None:
-            st.session_state.current_image = Image.open(uploaded_file).convert("RGB")
+            try:
+                with latency.time("decode"):
+                    st.session_state.current_image = load_image(uploaded_file)
+            except ValueError as e:
+                st.error(str(e))
 
         if st.session_state.current_image is not None:
 
@@ -1021,6 +1573,7 @@ elif st.session_state.page == "📷 Analyze Food":
             # Remove Image
             with col1:
                 if st.button("🗑 Remove Image"):
+                    cancel_analysis("upload")
                     st.session_state.current_image = None
                     st.session_state.analysis_done = False
                     st.session_state.top_results = None
@@ -1030,25 +1583,17 @@ elif st.session_state.page == "📷 Analyze Food":
 
             # Analyze Button
             if not st.session_state.analysis_done:
-                if st.button("🔍 Analyze Food"):
-                    with st.spinner("Analyzing image with AI model..."):
-                        processed = preprocess_image(np.array(st.session_state.current_image))
-                        preds = model.predict(processed, verbose=0)[0]
-
-                    processed = preprocess_image(
-                        np.array(st.session_state.current_image)
-                    )
-
-                    preds = model.predict(processed, verbose=0)[0]
-                    top_indices = preds.argsort()[-3:][::-1]
+                if not analysis_pending("upload"):
+                    if st.button("🔍 Analyze Food"):
+                        start_analysis(
+                            "upload", analyze_single, st.session_state.current_image,
+                            apply_single_result, degrade=degrade_single
+                        )
+                        st.rerun()
 
-                    st.session_state.top_results = [
-                        (class_names[i], float(preds[i] * 100))
-                        for i in top_indices
-                    ]
+                poll_analysis("upload", apply_single_result, "Analyzing image with AI model...")
 
-                    st.session_state.analysis_done = True
-                    st.rerun()
+            show_analysis_notice("upload")
 
         # ---------------- SHOW RESULTS ----------------
         if st.session_state.analysis_done and st.session_state.top_results:
@@ -1058,6 +1603,8 @@ elif st.session_state.page == "📷 Analyze Food":
             for food, conf in st.session_state.top_results:
                 st.write(f"• **{food}** — {conf:.2f}%")
 
+            show_similar_meals(st.session_state.current_embedding)
+
             st.session_state.selected_food = st.selectbox(
                 "Confirm the detected food:",
                 [food for food, _ in st.session_state.top_results]
@@ -1065,9 +1612,10 @@ elif st.session_state.page == "📷 Analyze Food":
 
             grams = st.slider("Portion Size (grams)", 50, 500, 100, 10)
 
-            row = calorie_df[
-                calorie_df["category"] == st.session_state.selected_food
-            ]
+            with latency.time("calorie_lookup"):
+                row = calorie_df[
+                    calorie_df["category"] == st.session_state.selected_food
+                ]
 
             if not row.empty:
 
@@ -1084,41 +1632,56 @@ elif st.session_state.page == "📷 Analyze Food":
                     today = datetime.date.today().isoformat()
 
                     # 1️⃣ Save log in database
-                    cursor.execute(
-                        "INSERT INTO food_logs VALUES (?, ?, ?, ?)",
-                        (
-                            st.session_state.username,
-                            st.session_state.selected_food,
-                            total_calories,
-                            today
+                    with latency.time("db_insert"):
+                        cursor.execute(
+                            "INSERT INTO food_logs VALUES (?, ?, ?, ?)",
+                            (
+                                st.session_state.username,
+                                st.session_state.selected_food,
+                                total_calories,
+                                today
+                            )
                         )
-                    )
-                    conn.commit()
-
-                    # 2️⃣ Save image for future training
-                    DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
-
-                    if not os.path.exists(DATASET_DIR):
-                        os.makedirs(DATASET_DIR)
+                        conn.commit()
 
-                    label_dir = os.path.join(
-                        DATASET_DIR,
+                    record_cascade_feedback(
+                        st.session_state.current_image,
                         st.session_state.selected_food
                     )
 
-                    if not os.path.exists(label_dir):
-                        os.makedirs(label_dir)
+                    # 2️⃣ Save image for future training (skipped if a near-duplicate exists)
+                    with latency.time("image_save"):
+                        saved = save_training_image(
+                            st.session_state.current_image,
+                            st.session_state.selected_food,
+                            conn=conn,
+                            source="upload",
+                            username=st.session_state.username
+                        )
 
-                    image_path = os.path.join(
-                        label_dir,
-                        f"{datetime.datetime.now().timestamp()}.jpg"
+                        if saved["saved"]:
+                            append_training_sample(
+                                st.session_state.current_image,
+                                st.session_state.selected_food,
+                                st.session_state.top_results
+                            )
+
+                    index_logged_image(
+                        st.session_state.current_embedding,
+                        saved,
+                        st.session_state.selected_food,
+                        total_calories,
+                        today
                     )
+                    st.session_state.current_embedding = None
 
-                    st.session_state.current_image.save(image_path)
-
-                    st.success("Food logged & training image saved successfully! 📸")
+                    if saved["duplicate"]:
+                        st.success("Food logged! This photo is already in the training set. 📸")
+                    else:
+                        st.success("Food logged & training image saved successfully! 📸")
 
                     # 3️⃣ Clear session
+                    st.session_state.analysis_notices.pop("upload", None)
                     st.session_state.current_image = None
                     st.session_state.analysis_done = False
                     st.session_state.top_results = None
@@ -1145,7 +1708,11 @@ elif st.session_state.page == "📷 Analyze Food":
         camera_input = st.camera_input("Take a picture of your food")
 
         if camera_input is not None:
-            st.session_state.camera_image = Image.open(camera_input).convert("RGB")
+            try:
+                with latency.time("decode"):
+                    st.session_state.camera_image = load_image(camera_input)
+            except ValueError as e:
+                st.error(str(e))
 
         if st.session_state.camera_image is not None:
 
@@ -1155,6 +1722,7 @@ elif st.session_state.page == "📷 Analyze Food":
 
             with col1:
                 if st.button("🗑 Remove Image"):
+                    cancel_analysis("camera")
                     st.session_state.camera_image = None
                     st.session_state.analysis_done = False
                     st.session_state.top_results = None
@@ -1162,23 +1730,17 @@ elif st.session_state.page == "📷 Analyze Food":
                     st.rerun()
 
             if not st.session_state.analysis_done:
-                if st.button("🔍 Analyze Captured Image"):
-
-                    with st.spinner("Analyzing image with AI model..."):
-                        processed = preprocess_image(
-                            np.array(st.session_state.camera_image)
+                if not analysis_pending("camera"):
+                    if st.button("🔍 Analyze Captured Image"):
+                        start_analysis(
+                            "camera", analyze_single, st.session_state.camera_image,
+                            apply_single_result, degrade=degrade_single
                         )
-                        preds = model.predict(processed, verbose=0)[0]
+                        st.rerun()
 
-                    top_indices = preds.argsort()[-3:][::-1]
+                poll_analysis("camera", apply_single_result, "Analyzing image with AI model...")
 
-                    st.session_state.top_results = [
-                        (class_names[i], float(preds[i] * 100))
-                        for i in top_indices
-                    ]
-
-                    st.session_state.analysis_done = True
-                    st.rerun()
+            show_analysis_notice("camera")
 
         # ---------------- SHOW RESULTS ----------------
         if st.session_state.analysis_done and st.session_state.top_results:
@@ -1188,6 +1750,8 @@ elif st.session_state.page == "📷 Analyze Food":
             for food, conf in st.session_state.top_results:
                 st.write(f"• **{food}** — {conf:.2f}%")
 
+            show_similar_meals(st.session_state.current_embedding)
+
             st.session_state.selected_food = st.selectbox(
                 "Confirm the detected food:",
                 [food for food, _ in st.session_state.top_results]
@@ -1195,9 +1759,10 @@ elif st.session_state.page == "📷 Analyze Food":
 
             grams = st.slider("Portion Size (grams)", 50, 500, 100, 10)
 
-            row = calorie_df[
-                calorie_df["category"] == st.session_state.selected_food
-            ]
+            with latency.time("calorie_lookup"):
+                row = calorie_df[
+                    calorie_df["category"] == st.session_state.selected_food
+                ]
 
             if not row.empty:
 
@@ -1217,44 +1782,57 @@ elif st.session_state.page == "📷 Analyze Food":
                     today = datetime.date.today().isoformat()
 
                     # 1️⃣ Save food log
-                    cursor.execute(
-                        "INSERT INTO food_logs VALUES (?, ?, ?, ?)",
-                        (
-                            st.session_state.username,
-                            st.session_state.selected_food,
-                            total_calories,
-                            today
+                    with latency.time("db_insert"):
+                        cursor.execute(
+                            "INSERT INTO food_logs VALUES (?, ?, ?, ?)",
+                            (
+                                st.session_state.username,
+                                st.session_state.selected_food,
+                                total_calories,
+                                today
+                            )
                         )
-                    )
-                    conn.commit()
-
-                    # 2️⃣ Save image for future training
-                    DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
-
-                    if not os.path.exists(DATASET_DIR):
-                        os.makedirs(DATASET_DIR)
+                        conn.commit()
 
-                    label_dir = os.path.join(
-                        DATASET_DIR,
+                    record_cascade_feedback(
+                        st.session_state.camera_image,
                         st.session_state.selected_food
                     )
 
-                    if not os.path.exists(label_dir):
-                        os.makedirs(label_dir)
+                    # 2️⃣ Save captured image for future training (skipped if a near-duplicate exists)
+                    with latency.time("image_save"):
+                        saved = save_training_image(
+                            st.session_state.camera_image,
+                            st.session_state.selected_food,
+                            conn=conn,
+                            source="camera",
+                            username=st.session_state.username
+                        )
 
-                    image_path = os.path.join(
-                        label_dir,
-                        f"{datetime.datetime.now().timestamp()}.jpg"
+                        if saved["saved"]:
+                            append_training_sample(
+                                st.session_state.camera_image,
+                                st.session_state.selected_food,
+                                st.session_state.top_results
+                            )
+
+                    index_logged_image(
+                        st.session_state.current_embedding,
+                        saved,
+                        st.session_state.selected_food,
+                        total_calories,
+                        today
                     )
+                    st.session_state.current_embedding = None
 
-                    # Save uploaded image
-                    if st.session_state.current_image is not None:
-                        st.session_state.current_image.save(image_path)
-
-                    st.success("Food logged & training image saved successfully! 📸")
+                    if saved["duplicate"]:
+                        st.success("Food logged! This photo is already in the training set. 📸")
+                    else:
+                        st.success("Food logged & training image saved successfully! 📸")
 
                     # 3️⃣ Clear session
-                    st.session_state.current_image = None
+                    st.session_state.analysis_notices.pop("camera", None)
+                    st.session_state.camera_image = None
                     st.session_state.analysis_done = False
                     st.session_state.top_results = None
                     st.session_state.selected_food = None
@@ -1262,6 +1840,226 @@ elif st.session_state.page == "📷 Analyze Food":
 
                     st.rerun()
 
+    # =====================================================
+    # 🍱 MULTI-FOOD PLATE MODE
+    # =====================================================
+    elif mode == "🍱 Multi-Food Plate":
+
+        if "plate_image" not in st.session_state:
+            st.session_state.plate_image = None
+
+        if "plate_results" not in st.session_state:
+            st.session_state.plate_results = None
+
+        plate_file = st.file_uploader(
+            "Upload a photo of your plate (thali, combo meal...)",
+            type=["jpg", "jpeg", "png"],
+            key=f"plate_uploader_{st.session_state.uploader_key}"
+        )
+
+        if plate_file and st.session_state.plate_image is None:
+            try:
+                st.session_state.plate_image = load_image(plate_file)
+            except ValueError as e:
+                st.error(str(e))
+
+        if st.session_state.plate_image is not None:
+
+            st.image(st.session_state.plate_image, width=350)
+
+            if st.button("🗑 Remove Image"):
+                cancel_analysis("plate")
+                st.session_state.plate_image = None
+                st.session_state.plate_results = None
+                st.session_state.uploader_key += 1
+                st.rerun()
+
+            if st.session_state.plate_results is None:
+                if not analysis_pending("plate"):
+                    if st.button("🔍 Analyze Plate"):
+                        start_analysis(
+                            "plate", analyze_plate, st.session_state.plate_image,
+                            apply_plate_result, degrade=degrade_plate
+                        )
+                        st.rerun()
+
+                poll_analysis("plate", apply_plate_result, "Looking for every food on the plate...")
+
+            show_analysis_notice("plate")
+
+        # ---------------- SHOW RESULTS ----------------
+        if st.session_state.plate_results:
+
+            st.markdown("## 🍽 Foods Detected")
+
+            plate_items = []
+
+            for i, item in enumerate(st.session_state.plate_results):
+
+                row = calorie_df[calorie_df["category"] == item["food"]]
+                if row.empty:
+                    st.warning(f"No calorie data for {item['food']} – skipped.")
+                    continue
+
+                c1, c2 = st.columns([2, 3])
+                c1.write(f"**{item['food']}** — {item['confidence']:.1f}%")
+                grams = c2.slider(
+                    f"{item['food']} portion (grams)",
+                    0, 500, 100, 10,
+                    key=f"plate_grams_{i}"
+                )
+
+                calories = float(row["calories_per_100g"].values[0]) / 100 * grams
+                if grams > 0:
+                    plate_items.append((item["food"], calories))
+
+            total_calories = sum(calories for _, calories in plate_items)
+
+            col1, col2 = st.columns(2)
+            col1.metric("Items", len(plate_items))
+            col2.metric("Total Calories", f"{total_calories:.0f} kcal")
+
+            if plate_items:
+                suggest_exercises(total_calories)
+
+                if st.button("✅ Confirm & Log Plate"):
+
+                    today = datetime.date.today().isoformat()
+
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO food_logs VALUES (?, ?, ?, ?)",
+                            [
+                                (st.session_state.username, food, calories, today)
+                                for food, calories in plate_items
+                            ]
+                        )
+
+                    st.success(f"Logged {len(plate_items)} foods ({total_calories:.0f} kcal) 🍱")
+
+                    st.session_state.analysis_notices.pop("plate", None)
+                    st.session_state.plate_image = None
+                    st.session_state.plate_results = None
+                    st.session_state.uploader_key += 1
+                    st.rerun()
+
+    # =====================================================
+    # 🗂 BATCH UPLOAD MODE
+    # =====================================================
+    elif mode == "🗂 Batch Upload":
+
+        if "batch_rows" not in st.session_state:
+            st.session_state.batch_images = None
+            st.session_state.batch_rows = None
+            st.session_state.batch_errors = []
+            st.session_state.batch_editor_version = 0
+
+        batch_files = st.file_uploader(
+            f"Upload several meal photos at once (up to {BATCH_UPLOAD_MAX_FILES})",
+            type=["jpg", "jpeg", "png"],
+            accept_multiple_files=True,
+            key=f"batch_uploader_{st.session_state.uploader_key}"
+        )
+
+        # Files removed from the uploader: drop any analysis still running
+        if not batch_files and st.session_state.batch_rows is None:
+            cancel_analysis("batch")
+
+        if batch_files and st.session_state.batch_rows is None:
+
+            if len(batch_files) > BATCH_UPLOAD_MAX_FILES:
+                st.warning(f"Only the first {BATCH_UPLOAD_MAX_FILES} photos will be analyzed.")
+                batch_files = batch_files[:BATCH_UPLOAD_MAX_FILES]
+
+            if not analysis_pending("batch"):
+                if st.button(f"🔍 Analyze {len(batch_files)} Photos"):
+                    start_analysis(
+                        "batch", analyze_batch,
+                        [(f.name, f.getvalue()) for f in batch_files],
+                        apply_batch_result
+                    )
+                    st.rerun()
+
+            poll_analysis("batch", apply_batch_result, f"Analyzing {len(batch_files)} photos...")
+            show_analysis_notice("batch")
+
+        # ---------------- SHOW RESULTS ----------------
+        if st.session_state.batch_rows is not None:
+
+            for name, error in st.session_state.batch_errors:
+                st.warning(f"Skipped {name}: {error}")
+
+            rows = st.session_state.batch_rows
+
+            if rows.empty:
+                st.info("None of the photos could be read.")
+            else:
+                st.markdown("## 🗂 Review Your Meals")
+
+                with st.expander("🖼 Photos", expanded=False):
+                    st.image(st.session_state.batch_images, caption=list(rows["Photo"]), width=150)
+
+                food_options = sorted(set(calorie_df["category"]) | set(rows["Food"]))
+
+                st.data_editor(
+                    rows,
+                    key=f"batch_editor_{st.session_state.batch_editor_version}",
+                    on_change=apply_batch_edits,
+                    hide_index=True,
+                    use_container_width=True,
+                    disabled=["Photo", "AI Confidence", "Calories"],
+                    column_config={
+                        "Log": st.column_config.CheckboxColumn("Log"),
+                        "Food": st.column_config.SelectboxColumn("Food", options=food_options, required=True),
+                        "AI Confidence": st.column_config.NumberColumn("AI Confidence", format="%.1f%%"),
+                        "Grams": st.column_config.NumberColumn("Grams", min_value=0, max_value=1000, step=10),
+                        "Calories": st.column_config.NumberColumn("Calories", format="%.0f kcal"),
+                    }
+                )
+
+                # Like single-photo mode, foods without calorie data are never logged
+                selected = rows[rows["Log"] & (rows["Grams"] > 0)]
+                known = selected["Food"].isin(calorie_df["category"])
+                missing = sorted(set(selected.loc[~known, "Food"]))
+                if missing:
+                    st.warning(f"No calorie data for {', '.join(missing)} – skipped.")
+                selected = selected[known]
+
+                total_calories = float(selected["Calories"].sum())
+
+                col1, col2 = st.columns(2)
+                col1.metric("Meals", len(selected))
+                col2.metric("Total Calories", f"{total_calories:.0f} kcal")
+
+                if not selected.empty:
+                    suggest_exercises(total_calories)
+
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    if st.button("✅ Log All Selected", disabled=selected.empty):
+
+                        today = datetime.date.today().isoformat()
+
+                        with latency.time("db_insert"):
+                            with conn:
+                                conn.executemany(
+                                    "INSERT INTO food_logs VALUES (?, ?, ?, ?)",
+                                    [
+                                        (st.session_state.username, food, float(calories), today)
+                                        for food, calories in zip(selected["Food"], selected["Calories"])
+                                    ]
+                                )
+
+                        st.success(f"Logged {len(selected)} meals ({total_calories:.0f} kcal) 🗂")
+                        clear_batch()
+                        st.rerun()
+
+                with col2:
+                    if st.button("🗑 Clear Photos"):
+                        clear_batch()
+                        st.rerun()
+
     # =====================================================
     # 📝 MANUAL MODE
     # =====================================================
@@ -2766,39 +3564,280 @@ elif st.session_state.page == "🔒 Admin Dashboard":
         st.info("No registered users found.")
 
     st.markdown("---")
-    st.subheader("📦 Dataset Export (For Model Improvement)")
 
-    import zipfile
+    # ================= INFERENCE QUEUE =================
+    st.subheader("⚙️ Inference Queue")
+
+    model = get_model_status()["model"]
+
+    if model is not None:
+        if isinstance(model, RemoteClassifier):
+            if model.using_daemon:
+                st.caption(f"Served by inference daemon at {model.socket_path}")
+            else:
+                st.warning(f"Inference daemon at {model.socket_path} is down – using in-process model.")
+
+        queue_stats = model.queue.stats()
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("⏳ Queue Depth", queue_stats["queue_depth"])
+        col2.metric("🔁 Batches Run", queue_stats["total_batches"])
+        col3.metric("📦 Avg Batch Size", f"{queue_stats['avg_batch_size']:.2f}")
+        col4.metric("🔝 Max Batch Size", queue_stats["max_batch_size"])
+
+        st.caption(
+            f"Limit {queue_stats['max_batch_size_limit']} images per batch • "
+            f"max wait {queue_stats['max_wait_ms']:.0f} ms • "
+            f"{queue_stats['total_requests']} requests served"
+        )
+
+        if queue_stats["batch_size_histogram"]:
+            st.bar_chart(pd.DataFrame(
+                {"batches": list(queue_stats["batch_size_histogram"].values())},
+                index=list(queue_stats["batch_size_histogram"].keys())
+            ))
+    else:
+        st.info("Model not loaded yet – no inference statistics.")
+
+    # ================= ADMISSION CONTROL =================
+    st.subheader("🚦 Admission Control")
+
+    admission_stats = get_admission_controller().stats()
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("🏃 In Flight", f"{admission_stats['outstanding']}/{admission_stats['limit']}")
+    col2.metric("✅ Admitted", admission_stats["admitted"])
+    col3.metric("💾 Served from Cache", admission_stats["degraded_cache"])
+    col4.metric("🪶 Lighter Model", admission_stats["degraded_fast_model"])
+    col5.metric("🛑 Shed", admission_stats["shed"])
+
+    st.caption(
+        f"{admission_stats['max_concurrent']} concurrent + {admission_stats['max_queued']} queued analyses • "
+        f"inference queue cap {admission_stats['max_queue_depth']} images • "
+        f"peak {admission_stats['peak_outstanding']} in flight"
+    )
+
+    # ================= INPUT RESOLUTION =================
+    resolution_report = load_resolution_report()
+    live_classifier = serving_classifier(model)
+
+    if resolution_report or ADAPTIVE_RESOLUTION:
+        st.subheader("🔬 Input Resolution")
+
+        if isinstance(live_classifier, AdaptiveResolutionClassifier):
+            resolution_stats = live_classifier.stats()
+            cols = st.columns(len(resolution_stats["sizes"]) + 1)
+            for col, size in zip(cols, resolution_stats["sizes"]):
+                col.metric(f"{size}px served", resolution_stats["served"][size])
+            cols[-1].metric("🔁 Retries", resolution_stats["retries"])
+            st.caption(f"Policy: {resolution_stats['policy']}")
+        elif ADAPTIVE_RESOLUTION:
+            st.info("Adaptive resolution is enabled but no exported variants were found – serving 224px only.")
+
+        if resolution_report:
+            st.caption(
+                f"Accuracy vs latency from export_resolutions.py "
+                f"({resolution_report['images']} labeled images, {resolution_report['created_at']}):"
+            )
+            st.dataframe(pd.DataFrame(resolution_report["resolutions"]).drop(columns=["path"]),
+                         use_container_width=True)
+
+    # ================= MODEL CASCADE =================
+    if CASCADE_FAST_BACKEND:
+        st.subheader("🪜 Model Cascade")
+
+        cascade_stats = load_cascade_log().stats()
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("🎚 Threshold", f"{CASCADE_THRESHOLD:.0f}%")
+        col2.metric("🖼 Images Classified", cascade_stats["requests"])
+        col3.metric("⬆️ Escalated", cascade_stats["escalated"])
+        col4.metric("📈 Escalation Rate", f"{cascade_stats['escalation_rate'] * 100:.1f}%")
+
+        if isinstance(model, CascadeClassifier) and model.label_error:
+            st.error(f"Cascade escalation disabled: {model.label_error}")
+
+        if cascade_stats["per_stage"]:
+            st.dataframe(pd.DataFrame([
+                {
+                    "Stage": stage,
+                    "Confirmed": row["confirmed"],
+                    "Accuracy": f"{row['accuracy'] * 100:.1f}%",
+                    "Fast Model Alone": f"{row['fast_accuracy'] * 100:.1f}%",
+                }
+                for stage, row in cascade_stats["per_stage"].items()
+            ]), use_container_width=True)
+
+            st.caption("Threshold what-if on confirmed images:")
+            st.dataframe(pd.DataFrame(cascade_stats["sweep"]), use_container_width=True)
+        else:
+            st.info("No confirmed cascade predictions yet – accuracy appears once users log foods.")
+
+    # ================= MODEL REGISTRY =================
+    st.subheader("🗃 Model Registry")
+
+    registry_versions = list_versions(MODEL_REGISTRY_DIR)
+    live_version = current_version(MODEL_REGISTRY_DIR)
+    shadow_version = candidate_version(MODEL_REGISTRY_DIR)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🟢 Live Version", live_version or "default")
+    col2.metric("👥 Shadow Candidate", shadow_version or "none")
+    col3.metric("📚 Registered", len(registry_versions))
+
+    if isinstance(model, RegistryClassifier) and model.active_version != live_version:
+        st.caption(f"This worker is still serving {model.active_version or 'default'} – switching shortly.")
+    if isinstance(model, RegistryClassifier) and model.load_error:
+        st.error(f"Model load failed: {model.load_error}")
+
+    if registry_versions:
+        st.dataframe(pd.DataFrame(registry_versions)[
+            ["version", "backend", "created_at", "notes"]
+        ], use_container_width=True)
+
+        chosen_version = st.selectbox(
+            "Version",
+            [meta["version"] for meta in registry_versions][::-1],
+            key="registry_version"
+        )
+
+        col1, col2, col3 = st.columns(3)
+        if col1.button("🚀 Promote to Live"):
+            promote(chosen_version, MODEL_REGISTRY_DIR)
+            st.success(f"{chosen_version} is live; workers switch within {MODEL_REGISTRY_CHECK_SECONDS:.0f}s.")
+        if col2.button("👥 Shadow Evaluate"):
+            set_candidate(chosen_version, MODEL_REGISTRY_DIR)
+            st.success(f"Shadow-evaluating {chosen_version} on live traffic.")
+        if col3.button("⏹ Stop Shadow"):
+            set_candidate(None, MODEL_REGISTRY_DIR)
+            st.info("Shadow evaluation stopped.")
+    else:
+        st.info("No registered versions – serving the default model. Add one with `python model_registry.py register`.")
+
+    shadow_summary = load_shadow_log().summary()
+    if shadow_summary:
+        st.caption("Shadow evaluation (candidate vs live, same requests):")
+        st.dataframe(pd.DataFrame([
+            {
+                "Live": row["live_version"],
+                "Candidate": row["candidate_version"],
+                "Images": row["images"],
+                "Agreement": f"{row['agreement'] * 100:.1f}%",
+                "Live ms/img": round(row["live_ms_per_image"], 1),
+                "Candidate ms/img": round(row["candidate_ms_per_image"], 1),
+                "Last Seen": row["last_seen"],
+            }
+            for row in shadow_summary
+        ]), use_container_width=True)
+
+    cache_stats = prediction_cache.stats()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🎯 Cache Hits", cache_stats["hits"])
+    col2.metric("❌ Cache Misses", cache_stats["misses"])
+    col3.metric("📈 Hit Rate", f"{cache_stats['hit_rate'] * 100:.1f}%")
+    col4.metric("🗂 Cached Images", f"{cache_stats['entries']}/{cache_stats['max_entries']}")
+
+    st.markdown("---")
+
+    # ================= ANALYSIS LATENCY =================
+    st.subheader("⏱ Food Analysis Latency by Stage")
+
+    latency_rows = latency.summary()
+
+    if latency_rows:
+        st.dataframe(
+            pd.DataFrame(latency_rows).set_index("stage"),
+            use_container_width=True
+        )
+        st.download_button(
+            "⬇ Export Timings (JSON Lines)",
+            latency.export_jsonl(),
+            file_name="analysis_latency.jsonl",
+            mime="application/x-ndjson"
+        )
+    else:
+        st.info("No analyses timed yet in this process.")
+
+    st.markdown("---")
+    st.subheader("📦 Dataset Export (For Model Improvement)")
 
     DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
 
     if os.path.exists(DATASET_DIR):
 
-        total_images = 0
-        for root, dirs, files in os.walk(DATASET_DIR):
-            total_images += len(files)
-
-        st.metric("📸 Collected Training Images", total_images)
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM training_images")
+        total_images, total_bytes = cursor.fetchone()
 
-        zip_path = os.path.join(BASE_DIR, "user_training_data.zip")
+        dedup = dedup_stats(DATASET_DIR)
 
-        if st.button("📥 Prepare Dataset for Download"):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("📸 Collected Training Images", total_images)
+        col2.metric("🗄 Dataset Size", f"{total_bytes / 1e6:.1f} MB")
+        col3.metric("♻️ Duplicates Skipped", dedup["duplicates_skipped"])
+        col4.metric("💾 Storage Saved", f"{dedup['bytes_saved'] / 1e6:.1f} MB")
+
+        df_labels = pd.read_sql_query("""
+            SELECT label, COUNT(*) as images
+            FROM training_images
+            GROUP BY label
+            ORDER BY images DESC
+        """, conn)
+
+        if not df_labels.empty:
+            st.bar_chart(df_labels.set_index("label"))
+        else:
+            st.caption("Manifest is empty – run `python training_data.py reconcile` to index existing images.")
 
-            with zipfile.ZipFile(zip_path, "w") as zipf:
-                for root, dirs, files in os.walk(DATASET_DIR):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        zipf.write(file_path)
+        export_manager = get_export_manager()
 
-            st.success("Dataset ready for download.")
+        col1, col2 = st.columns(2)
 
-        if os.path.exists(zip_path):
-            with open(zip_path, "rb") as f:
+        if col1.button("📥 Export New Images"):
+            export_manager.start(full=False)
+
+        if col2.button("📦 Full Export"):
+            export_manager.start(full=True)
+
+        @st.fragment(run_every=1.0)
+        def show_export_progress():
+            job = export_manager.current
+            if job is None:
+                return
+
+            if job.running:
+                st.progress(job.progress, text=f"Exporting {job.done}/{job.total} images...")
+            elif job.status == "done":
+                st.success(f"Export finished: {job.done} images.")
+            elif job.status == "nothing":
+                st.info("No new images since the last export.")
+            elif job.status == "failed":
+                st.error(f"Export failed: {job.error}")
+
+        show_export_progress()
+
+        archives = export_manager.archives()
+
+        if archives:
+            st.markdown("**Available archives**")
+            labels = {
+                f'{archive["kind"].title()} export – {archive["created_at"][:16]} '
+                f'({archive["images"]} images, {archive["size_bytes"] / 1e6:.1f} MB)': archive
+                for archive in archives
+            }
+            # Only the chosen archive is read into memory for the download
+            archive = labels[st.selectbox("Archive", list(labels))]
+            with open(archive["path"], "rb") as f:
                 st.download_button(
-                    "⬇ Download Training Dataset",
-                    f,
-                    file_name="user_training_data.zip"
+                    "⬇ Download Archive",
+                    data=f.read(),
+                    file_name=archive["file"],
+                    mime="application/zip"
                 )
+            st.caption(
+                f"The newest {KEEP_ARCHIVES} archives are kept for up to "
+                f"{MAX_ARCHIVE_AGE_DAYS:g} days."
+            )
 
     else:
         st.info("No collected training data available yet.")   
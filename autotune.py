@@ -0,0 +1,151 @@
+import argparse
+import datetime
+import os
+import sys
+
+from bench_inference import DATASET_DIR, resolve_model, run_config
+from host_profile import host_id, load_host_profile, profile_path, save_host_profile
+from model_registry import REGISTRY_DIR
+from model_utils import list_labeled_images, model_version
+
+
+# ---------------- SEARCH SPACE ----------------
+def thread_candidates(cpu_count):
+    cpu_count = max(1, cpu_count or 1)
+    return sorted({n for n in (1, 2, 4, cpu_count // 2, cpu_count) if 1 <= n <= cpu_count})
+
+
+def inter_op_candidates(backend, cpu_count):
+    if backend == "tflite":
+        return [None]
+    return [1, 2] if (cpu_count or 1) >= 2 else [1]
+
+
+def onednn_candidates(backend):
+    return [True, False] if backend == "keras" else [None]
+
+
+# ---------------- TUNING ----------------
+# Each candidate runs in a fresh worker process (bench_inference.run_config).
+# The winner is the highest throughput whose p95 batch latency stays inside
+# the budget, since several sessions share the batching queue.
+
+def tune(backend, model, batch_sizes, max_p95_ms, repeats, warmup, data, timeout, log=print):
+    cpu_count = os.cpu_count()
+    measured = []
+    best = None
+
+    for onednn in onednn_candidates(backend):
+        for threads in thread_candidates(cpu_count):
+            for inter in inter_op_candidates(backend, cpu_count):
+                spec = {
+                    "backend": backend,
+                    "model_path": model["model_path"],
+                    "labels_path": model["labels_path"],
+                    "num_threads": threads,
+                    "inter_op_threads": inter,
+                    "batch_sizes": batch_sizes,
+                    "repeats": repeats,
+                    "warmup": warmup,
+                    "data": data,
+                    "limit": max(batch_sizes),
+                    "evaluate": False,
+                }
+                env = {} if onednn is None else {"TF_ENABLE_ONEDNN_OPTS": "1" if onednn else "0"}
+                result = run_config(spec, timeout, env=env)
+                config = {"onednn": onednn, "num_threads": threads, "inter_op_threads": inter}
+
+                if "error" in result:
+                    log(f"  {config}: error {result['error']}")
+                    measured.append({**config, "error": result["error"]})
+                    continue
+
+                for run in result["runs"]:
+                    measured.append({**config, **run})
+                    within_budget = run["p95_ms"] <= max_p95_ms
+                    log(
+                        f"  onednn={onednn} threads={threads} inter={inter} batch={run['batch_size']}: "
+                        f"{run['throughput_ips']:.1f} img/s, p95 {run['p95_ms']:.1f} ms"
+                        + ("" if within_budget else " (over budget)")
+                    )
+                    if not within_budget:
+                        continue
+                    key = (run["throughput_ips"], -run["p95_ms"])
+                    if best is None or key > best[0]:
+                        best = (key, {**config, **run})
+
+    return (best[1] if best else None), measured
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the classifier on this host and save the fastest thread, "
+                    "oneDNN and batch-size settings as its inference profile."
+    )
+    parser.add_argument("--backend", default=os.environ.get("INFERENCE_BACKEND", "keras"))
+    parser.add_argument("--model", help="model file (default: what load_model() would load)")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY_DIR", REGISTRY_DIR))
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32")
+    parser.add_argument("--max-p95-ms", type=float, default=500.0,
+                        help="latency budget for one batch")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--data", default=DATASET_DIR)
+    parser.add_argument("--timeout", type=float, default=900)
+    parser.add_argument("--out", help="profile path (default: host_profiles/<host>.json)")
+    parser.add_argument("--if-missing", action="store_true",
+                        help="do nothing when this host already has a profile (for entrypoints)")
+    args = parser.parse_args()
+
+    out_path = args.out or profile_path()
+    if args.if_missing and load_host_profile(out_path):
+        print(f"Profile already exists: {out_path}")
+        return 0
+
+    model = resolve_model(args.backend, args.registry, args.model)
+    if not os.path.exists(model["model_path"]):
+        print(f"Model not found: {model['model_path']}")
+        return 1
+
+    data = args.data if args.data and list_labeled_images(args.data) else ""
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    print(f"Tuning {args.backend} ({model['model_path']}) on {host_id()}")
+    best, measured = tune(
+        args.backend, model, batch_sizes, args.max_p95_ms,
+        args.repeats, args.warmup, data, args.timeout
+    )
+    if best is None:
+        print(f"No configuration met the {args.max_p95_ms:.0f} ms p95 budget; profile not written.")
+        return 1
+
+    profile = {
+        "host": host_id(),
+        "cpu_count": os.cpu_count(),
+        "backend": args.backend,
+        "model_path": model["model_path"],
+        "model_sha256_16": model_version(model["model_path"]),
+        "num_threads": best["num_threads"],
+        "inter_op_threads": best["inter_op_threads"],
+        "onednn": best["onednn"],
+        "batch_size": best["batch_size"],
+        "throughput_ips": best["throughput_ips"],
+        "p50_ms": best["p50_ms"],
+        "p95_ms": best["p95_ms"],
+        "max_p95_ms": args.max_p95_ms,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "measured": measured,
+    }
+    path = save_host_profile(profile, out_path)
+
+    print(
+        f"Best: threads={best['num_threads']} inter={best['inter_op_threads']} "
+        f"onednn={best['onednn']} batch={best['batch_size']} "
+        f"({best['throughput_ips']:.1f} img/s, p95 {best['p95_ms']:.1f} ms)"
+    )
+    print(f"Saved {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
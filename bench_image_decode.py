@@ -0,0 +1,105 @@
+import argparse
+import gc
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from image_io import load_image
+from model_utils import preprocess_image
+from process_memory import reset_peak_rss, status_kb
+
+
+# ---------------- DECODE PATHS ----------------
+def full_decode(path):
+    image = Image.open(path).convert("RGB")
+    return preprocess_image(np.array(image))
+
+
+def draft_decode(path):
+    return preprocess_image(np.array(load_image(path)))
+
+
+PATHS = {"full": full_decode, "draft": draft_decode}
+
+
+def make_phone_photo(path, size=(4032, 3024)):
+    # Smooth gradient + noise so the JPEG compresses like a real photo
+    w, h = size
+    x = np.linspace(0, 255, w, dtype="float32")
+    y = np.linspace(0, 255, h, dtype="float32")[:, None]
+    rng = np.random.default_rng(0)
+    pixels = np.stack([
+        (x + y) / 2,
+        np.broadcast_to(x, (h, w)),
+        np.broadcast_to(y, (h, w)),
+    ], axis=-1) + rng.normal(0, 4, (h, w, 3))
+
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype("uint8"))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW, as phones write it
+    image.save(path, quality=92, exif=exif)
+
+
+# ---------------- MEASUREMENT ----------------
+def measure(path_name, image_path, warmup_path, repeats):
+    fn = PATHS[path_name]
+
+    # Warm imports/decoder on a tiny image before taking the RSS baseline
+    fn(warmup_path)
+    gc.collect()
+    baseline_kb = reset_peak_rss()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(image_path)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "median_ms": statistics.median(timings),
+        "peak_rss_growth_mb": (status_kb("VmHWM") - baseline_kb) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare full-resolution and draft-mode decoding of phone-sized photos."
+    )
+    parser.add_argument("images", nargs="*", help="JPEGs to test (default: a synthetic 12 MP photo)")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    warmup_path = os.path.join(tmp_dir.name, "warmup.jpg")
+    make_phone_photo(warmup_path, size=(320, 240))
+
+    images = list(args.images)
+    if not images:
+        synthetic = os.path.join(tmp_dir.name, "phone_12mp.jpg")
+        make_phone_photo(synthetic)
+        images.append(synthetic)
+
+    print(f"{'image':<28}{'path':<8}{'median ms':>12}{'peak RSS +MB':>15}")
+    for image_path in images:
+        with Image.open(image_path) as image:
+            label = f"{os.path.basename(image_path)} {image.size[0]}x{image.size[1]}"
+
+        results = {name: measure(name, image_path, warmup_path, args.repeats) for name in PATHS}
+        for name, stats in results.items():
+            print(
+                f"{label[:27]:<28}{name:<8}"
+                f"{stats['median_ms']:>12.1f}{stats['peak_rss_growth_mb']:>15.1f}"
+            )
+
+        speedup = results["full"]["median_ms"] / max(results["draft"]["median_ms"], 1e-6)
+        print(f"{'':<28}speedup x{speedup:.1f}")
+
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
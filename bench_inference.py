@@ -0,0 +1,273 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from inference_backends import DEFAULT_MODEL_PATHS, load_backend, load_class_names
+from model_registry import REGISTRY_DIR, current_version, resolve
+from model_utils import list_labeled_images, load_image_array, model_version
+from process_memory import peak_rss_mb, reset_peak_rss
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LABELS_PATH = os.path.join(BASE_DIR, "class_labels.json")
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+
+
+# ---------------- MODEL RESOLUTION ----------------
+# Same choice as the app's load_model(): the registry's CURRENT version when
+# it is for this backend, otherwise the backend's default artifact.
+
+def resolve_model(backend, registry_dir=REGISTRY_DIR, model_path=None):
+    if model_path:
+        return {"version": "explicit", "model_path": model_path, "labels_path": LABELS_PATH}
+
+    version = current_version(registry_dir)
+    if version:
+        entry = resolve(version, registry_dir)
+        if entry["backend"] == backend:
+            return {"version": version, "model_path": entry["model_path"], "labels_path": entry["labels_path"]}
+
+    return {"version": "default", "model_path": DEFAULT_MODEL_PATHS[backend], "labels_path": LABELS_PATH}
+
+
+# ---------------- WORKER (one backend + thread setting per process) ----------------
+# TF thread pools can only be sized before the first op, and peak RSS has to
+# be per configuration, so every configuration runs in a fresh interpreter.
+
+def _sample_images(samples, count, seed=0):
+    if samples:
+        return [load_image_array(path) for path, _ in samples[:count]]
+    # No labeled folder: phone-camera-sized noise still exercises resize + predict
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (480, 640, 3), dtype="uint8") for _ in range(count)]
+
+
+def run_batch(backend, images):
+    return backend.predict(np.stack([backend.prepare(image) for image in images]))
+
+
+def evaluate(backend, class_names, samples, batch_size=32):
+    by_lower = {name.lower(): i for i, name in enumerate(class_names)}
+    known = [(path, by_lower[label.lower()]) for path, label in samples if label.lower() in by_lower]
+
+    n_classes = len(class_names)
+    confusion = np.zeros((n_classes, n_classes), dtype="int64")
+    top3_correct = 0
+
+    for start in range(0, len(known), batch_size):
+        chunk = known[start:start + batch_size]
+        probs = run_batch(backend, [load_image_array(path) for path, _ in chunk])
+        top3 = np.argsort(probs, axis=1)[:, -3:]
+        for (_, truth), row, best in zip(chunk, top3, probs.argmax(axis=1)):
+            confusion[truth, best] += 1
+            top3_correct += int(truth in row)
+
+    support = confusion.sum(axis=1)
+    correct = np.diag(confusion)
+    return {
+        "images": len(known),
+        "skipped_unknown_label": len(samples) - len(known),
+        "top1_accuracy": float(correct.sum() / len(known)) if known else None,
+        "top3_accuracy": float(top3_correct / len(known)) if known else None,
+        "per_class": {
+            class_names[i]: {
+                "support": int(support[i]),
+                "accuracy": float(correct[i] / support[i]),
+            }
+            for i in range(n_classes) if support[i]
+        },
+        "labels": class_names,
+        "confusion_matrix": confusion.tolist(),
+    }
+
+
+def run_worker(spec):
+    start = time.perf_counter()
+    backend = load_backend(
+        spec["backend"],
+        spec["model_path"],
+        num_threads=spec["num_threads"],
+        inter_op_threads=spec["inter_op_threads"]
+    )
+    load_ms = (time.perf_counter() - start) * 1000
+
+    samples = list_labeled_images(spec["data"])[:spec["limit"]] if spec["data"] else []
+    images = _sample_images(samples, max(spec["batch_sizes"]))
+
+    runs = []
+    for batch_size in spec["batch_sizes"]:
+        batch = [images[i % len(images)] for i in range(batch_size)]
+        for _ in range(spec["warmup"]):
+            run_batch(backend, batch)
+
+        gc.collect()
+        reset_peak_rss()
+
+        timings = []
+        for _ in range(spec["repeats"]):
+            t0 = time.perf_counter()
+            run_batch(backend, batch)
+            timings.append((time.perf_counter() - t0) * 1000)
+
+        p50, p95 = np.percentile(timings, [50, 95])
+        runs.append({
+            "batch_size": batch_size,
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "mean_ms": round(float(np.mean(timings)), 3),
+            "throughput_ips": round(batch_size * len(timings) / (sum(timings) / 1000), 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+
+    result = {"load_ms": round(load_ms, 1), "runs": runs}
+    if spec["evaluate"]:
+        result["accuracy"] = evaluate(backend, load_class_names(spec["labels_path"]), samples)
+    return result
+
+
+def run_config(spec, timeout, env=None):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec)],
+        capture_output=True, text=True, timeout=timeout,
+        env={**os.environ, **(env or {})}
+    )
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["worker failed"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ---------------- SWEEP ----------------
+def _thread_list(value):
+    return [None if v in ("default", "") else int(v) for v in value.split(",")]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark classifier latency, throughput, memory and accuracy across "
+                    "backends, batch sizes and thread counts."
+    )
+    parser.add_argument("--backends", default="keras,tflite,onnx")
+    parser.add_argument("--model", help="model file (only with a single backend)")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--threads", default="default,1,2,4",
+                        help="intra-op / interpreter thread counts ('default' = library choice)")
+    parser.add_argument("--inter-op-threads", default="default,1,2",
+                        help="TF/ONNX inter-op thread counts")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--data", default=DATASET_DIR,
+                        help="labeled folder laid out like user_added_data/ ('' = synthetic images)")
+    parser.add_argument("--limit", type=int, default=2000, help="max labeled images to evaluate")
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "bench_inference.json"))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker))))
+        return 0
+
+    backends = args.backends.split(",")
+    if args.model and len(backends) != 1:
+        parser.error("--model needs exactly one backend")
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    has_data = bool(args.data) and bool(list_labeled_images(args.data))
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "git_commit": _git_commit(),
+        "batch_sizes": batch_sizes,
+        "data": args.data if has_data else "synthetic",
+        "models": {},
+        "results": [],
+        "accuracy": {},
+    }
+
+    print(f"{'backend':<8}{'threads':>8}{'inter':>6}{'batch':>6}{'img/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>9}")
+
+    for backend in backends:
+        model = resolve_model(backend, args.registry, args.model)
+        if not os.path.exists(model["model_path"]):
+            print(f"{backend:<8} skipped: {model['model_path']} not found")
+            continue
+        report["models"][backend] = {**model, "sha256_16": model_version(model["model_path"])}
+
+        inter_values = _thread_list(args.inter_op_threads) if backend != "tflite" else [None]
+        first = True
+        for threads in _thread_list(args.threads):
+            for inter in inter_values:
+                spec = {
+                    "backend": backend,
+                    "model_path": model["model_path"],
+                    "labels_path": model["labels_path"],
+                    "num_threads": threads,
+                    "inter_op_threads": inter,
+                    "batch_sizes": batch_sizes,
+                    "repeats": args.repeats,
+                    "warmup": args.warmup,
+                    "data": args.data if has_data else "",
+                    "limit": args.limit,
+                    # Accuracy does not depend on threads: evaluate once per backend
+                    "evaluate": first and has_data,
+                }
+                first = False
+
+                result = run_config(spec, args.timeout)
+                config = {"backend": backend, "num_threads": threads, "inter_op_threads": inter}
+
+                if "error" in result:
+                    print(f"{backend:<8}{str(threads):>8}{str(inter):>6}  error: {result['error']}")
+                    report["results"].append({**config, "error": result["error"]})
+                    continue
+
+                if "accuracy" in result:
+                    report["accuracy"][backend] = result["accuracy"]
+
+                for run in result["runs"]:
+                    report["results"].append({**config, "load_ms": result["load_ms"], **run})
+                    print(
+                        f"{backend:<8}{str(threads):>8}{str(inter):>6}{run['batch_size']:>6}"
+                        f"{run['throughput_ips']:>10.1f}{run['p50_ms']:>10.1f}"
+                        f"{run['p95_ms']:>10.1f}{run['peak_rss_mb']:>9.0f}"
+                    )
+
+    for backend, accuracy in report["accuracy"].items():
+        if not accuracy["images"]:
+            continue
+        print(
+            f"{backend}: top-1 {accuracy['top1_accuracy']:.3f}, top-3 {accuracy['top3_accuracy']:.3f} "
+            f"on {accuracy['images']} images"
+        )
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from bench_inference import resolve_model
+from inference_backends import load_backend, load_class_names
+from model_registry import REGISTRY_DIR
+from model_utils import IMG_SIZE, list_labeled_images, model_version
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+
+COLUMNS = ["path", "label", "predicted", "confidence", "top3", "disagrees", "model_version", "scored_at", "error"]
+
+
+# ---------------- OUTPUT SINKS ----------------
+# Both sinks remember what a previous (interrupted) run already scored with
+# the same model version, so a rerun only processes the remainder. Images
+# that cannot be decoded are recorded too, with `error` set, so they are not
+# retried on every run.
+
+class SqliteSink:
+    def __init__(self, path, version):
+        self.version = version
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                path TEXT,
+                label TEXT,
+                predicted TEXT,
+                confidence REAL,
+                top3 TEXT,
+                disagrees INTEGER,
+                model_version TEXT,
+                scored_at TEXT,
+                error TEXT,
+                PRIMARY KEY (path, model_version)
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(predictions)")}
+        if "error" not in columns:
+            self.conn.execute("ALTER TABLE predictions ADD COLUMN error TEXT")
+        self.conn.commit()
+
+    def done_paths(self):
+        rows = self.conn.execute(
+            "SELECT path FROM predictions WHERE model_version=?",
+            (self.version,)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def write(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO predictions ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                [tuple(row[c] for c in COLUMNS) for row in rows]
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class CsvSink:
+    def __init__(self, path, version):
+        self.version = version
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        fieldnames = COLUMNS
+        if not new_file:
+            # Keep appending in the existing file's column layout
+            with open(path, newline="") as f:
+                fieldnames = next(csv.reader(f))
+        self.f = open(path, "a", newline="")
+        self.writer = csv.DictWriter(self.f, fieldnames=fieldnames, extrasaction="ignore")
+        if new_file:
+            self.writer.writeheader()
+
+    def done_paths(self):
+        with open(self.path, newline="") as f:
+            return {
+                row["path"] for row in csv.DictReader(f)
+                if row.get("model_version") == self.version
+            }
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def open_sink(path, version):
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteSink(path, version)
+    return CsvSink(path, version)
+
+
+# ---------------- TF.DATA PIPELINE ----------------
+def build_dataset(samples, batch_size, takes_uint8):
+    import tensorflow as tf
+
+    paths = [path for path, _ in samples]
+    labels = [label for _, label in samples]
+
+    def load(path, label):
+        image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        image = tf.image.resize(image, (IMG_SIZE, IMG_SIZE))
+        if takes_uint8:
+            image = tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+        else:
+            image = image / 255.0
+        return path, label, image
+
+    return (
+        tf.data.Dataset.from_tensor_slices((paths, labels))
+        .map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+        .ignore_errors()
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-score every image under a labeled folder with the food classifier."
+    )
+    parser.add_argument("--data", default=DATASET_DIR)
+    parser.add_argument("--model", default=None,
+                        help="Keras model file (default: the registry's CURRENT keras version)")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY_DIR", REGISTRY_DIR))
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "bulk_predictions.csv"),
+                        help="CSV file, or .db/.sqlite for a SQLite table")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    # Same model and labels the app is serving
+    spec = resolve_model("keras", args.registry, args.model)
+    backend = load_backend("keras", spec["model_path"])
+    class_names = load_class_names(spec["labels_path"])
+    version = f"keras:{model_version(spec['model_path'])}"
+
+    sink = open_sink(args.out, version)
+    done = sink.done_paths()
+    samples = [s for s in list_labeled_images(args.data) if s[0] not in done]
+
+    print(f"{len(done)} images already scored with {version}; {len(samples)} to go.")
+    if not samples:
+        sink.close()
+        return 0
+
+    dataset = build_dataset(samples, args.batch_size, backend.takes_uint8)
+
+    scored = 0
+    disagreements = 0
+    seen = set()
+    failed = []
+    start = time.perf_counter()
+
+    try:
+        for paths, labels, images in dataset:
+            probs = backend.model.predict_on_batch(images)
+            probs = np.asarray(probs)
+            now = datetime.datetime.now().isoformat()
+
+            rows = []
+            for path, label, image_probs in zip(paths.numpy(), labels.numpy(), probs):
+                top3 = np.argsort(image_probs)[-3:][::-1]
+                predicted = class_names[top3[0]]
+                label = label.decode("utf-8")
+                disagrees = predicted.lower() != label.lower()
+                disagreements += disagrees
+
+                rows.append({
+                    "path": path.decode("utf-8"),
+                    "label": label,
+                    "predicted": predicted,
+                    "confidence": round(float(image_probs[top3[0]] * 100), 2),
+                    "top3": json.dumps([class_names[i] for i in top3]),
+                    "disagrees": int(disagrees),
+                    "model_version": version,
+                    "scored_at": now,
+                    "error": None,
+                })
+
+            sink.write(rows)
+            seen.update(row["path"] for row in rows)
+            scored += len(rows)
+
+            elapsed = time.perf_counter() - start
+            print(f"\r{scored}/{len(samples)} images  {scored / elapsed:.1f} img/s", end="", flush=True)
+
+        # Whatever the pipeline dropped failed to read or decode
+        failed = [(path, label) for path, label in samples if path not in seen]
+        if failed:
+            now = datetime.datetime.now().isoformat()
+            sink.write([
+                {
+                    "path": path,
+                    "label": label,
+                    "predicted": "",
+                    "confidence": None,
+                    "top3": "[]",
+                    "disagrees": 0,
+                    "model_version": version,
+                    "scored_at": now,
+                    "error": "could not read or decode image",
+                }
+                for path, label in failed
+            ])
+            print(f"\nSkipped {len(failed)} unreadable images:")
+            for path, _ in failed:
+                print(f"  {path}")
+
+    except KeyboardInterrupt:
+        print("\nInterrupted – rerun the same command to resume.")
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"\nScored {scored} images in {elapsed:.1f}s "
+        f"({scored / max(elapsed, 1e-9):.1f} img/s); "
+        f"{disagreements} disagree with their folder label; "
+        f"{len(failed)} unreadable."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
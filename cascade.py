@@ -0,0 +1,261 @@
+import contextlib
+import datetime
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from inference_backends import top_predictions
+from prediction_cache import image_key
+
+# Candidate thresholds shown in the admin what-if table
+SWEEP_THRESHOLDS = [50, 60, 70, 75, 80, 85, 90, 95]
+
+
+def ensure_cascade_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cascade_decisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_key TEXT,
+            stage TEXT,
+            fast_label TEXT,
+            fast_confidence REAL,
+            label TEXT,
+            confidence REAL,
+            threshold REAL,
+            confirmed_label TEXT,
+            created_at TEXT
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cascade_decisions_key ON cascade_decisions(image_key)"
+    )
+    conn.commit()
+
+
+def _key(image, version):
+    if hasattr(image, "mode"):
+        return image_key(image, version)
+    array = np.ascontiguousarray(image)
+    h = hashlib.sha256(version.encode("utf-8"))
+    h.update(f"{array.dtype}:{array.shape}".encode("utf-8"))
+    h.update(array.tobytes())
+    return h.hexdigest()
+
+
+# ---------------- DECISION LOG ----------------
+# One row per classified image: which stage answered and what the fast model
+# said. Confirmations from the Analyze page fill in confirmed_label, which
+# gives per-stage accuracy and lets the threshold be tuned offline.
+
+class CascadeLog:
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            ensure_cascade_table(self._conn)
+
+    def record(self, rows):
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO cascade_decisions
+                (image_key, stage, fast_label, fast_confidence, label, confidence, threshold, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [row + (now,) for row in rows]
+            )
+            self._conn.commit()
+
+    def confirm(self, key, label):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE cascade_decisions SET confirmed_label = ? "
+                "WHERE image_key = ? AND confirmed_label IS NULL",
+                (label, key)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            requests, escalated = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stage = 'full'), 0) FROM cascade_decisions"
+            ).fetchone()
+
+            stages = self._conn.execute("""
+                SELECT stage,
+                       COUNT(*),
+                       SUM(label = confirmed_label),
+                       SUM(fast_label = confirmed_label)
+                FROM cascade_decisions
+                WHERE confirmed_label IS NOT NULL
+                GROUP BY stage
+            """).fetchall()
+
+            confirmed = self._conn.execute("""
+                SELECT fast_confidence, fast_label = confirmed_label
+                FROM cascade_decisions
+                WHERE confirmed_label IS NOT NULL
+            """).fetchall()
+
+        per_stage = {
+            stage: {
+                "confirmed": n,
+                "accuracy": correct / n,
+                # For escalated images: how often the fast model alone was right
+                "fast_accuracy": fast_correct / n,
+            }
+            for stage, n, correct, fast_correct in stages
+        }
+
+        # What-if per threshold, from confirmed images: share that would
+        # escalate and how accurate the fast model is on the rest
+        sweep = []
+        if confirmed:
+            conf = np.array([c for c, _ in confirmed], dtype="float64")
+            fast_ok = np.array([ok for _, ok in confirmed], dtype=bool)
+            for t in SWEEP_THRESHOLDS:
+                kept = conf >= t
+                sweep.append({
+                    "threshold": t,
+                    "escalation_rate": float(1 - kept.mean()),
+                    "fast_accuracy_kept": float(fast_ok[kept].mean()) if kept.any() else None,
+                })
+
+        return {
+            "requests": requests,
+            "escalated": escalated,
+            "escalation_rate": escalated / requests if requests else 0.0,
+            "per_stage": per_stage,
+            "sweep": sweep,
+        }
+
+
+# ---------------- TWO-STAGE CASCADE ----------------
+# A small, fast classifier answers first; only images whose top-1 confidence
+# is below `threshold` (percent) are sent on to the full model. Full-model
+# results are mapped onto the fast model's labels by name on every call, since
+# the full stage can be a registry model that hot-swaps to a new label set.
+
+class CascadeClassifier:
+    def __init__(self, fast, full, threshold=80.0, log=None, latency=None):
+        # Retrained models use food_calories.csv spelling: compare case-insensitively
+        if {name.lower() for name in fast.class_names} - {name.lower() for name in full.class_names}:
+            raise ValueError("Full cascade stage must know every fast-stage class label")
+
+        self.fast = fast
+        self.full = full
+        self.threshold = float(threshold)
+        self.log = log
+        self.latency = latency
+        self.queue = fast.queue
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalated = 0
+        # Set while `full` (e.g. a hot-swapped registry model) lacks some of
+        # the fast model's labels; escalation is skipped until it is cleared
+        self.label_error = None
+
+    @property
+    def class_names(self):
+        return self.fast.class_names
+
+    @property
+    def version(self):
+        return f"cascade:{self.fast.version}>{self.full.version}@{self.threshold:g}"
+
+    def _timed(self, stage):
+        if self.latency is None:
+            return contextlib.nullcontext()
+        return self.latency.time(stage)
+
+    def _predict_full(self, images):
+        # Labels and probabilities from the same model: `full` may hot-swap
+        # between reading class_names and predicting
+        predict_labeled = getattr(self.full, "predict_labeled", None)
+        if predict_labeled is not None:
+            return predict_labeled(images)
+        return self.full.class_names, self.full.predict(images)
+
+    def _align(self, full_names, full_probs):
+        # Full-model probabilities re-ordered into the fast model's label order
+        full_names = [name.lower() for name in full_names]
+        if full_names == [name.lower() for name in self.class_names]:
+            self.label_error = None
+            return np.asarray(full_probs, dtype="float32")
+
+        index = {name: i for i, name in enumerate(full_names)}
+        missing = [name for name in self.class_names if name.lower() not in index]
+        if missing:
+            self.label_error = (
+                f"full model lacks fast-model labels {', '.join(missing[:5])}"
+                f"{'…' if len(missing) > 5 else ''}; serving fast-model results"
+            )
+            return None
+
+        self.label_error = None
+        return np.asarray(full_probs, dtype="float32")[:, [index[name.lower()] for name in self.class_names]]
+
+    def predict(self, images):
+        with self._timed("cascade_fast"):
+            probs = np.array(self.fast.predict(images), dtype="float32")
+
+        fast_idx = probs.argmax(axis=1)
+        fast_conf = probs.max(axis=1) * 100
+        escalate = np.flatnonzero(fast_conf < self.threshold)
+
+        if len(escalate):
+            with self._timed("cascade_full"):
+                full_probs = self._align(*self._predict_full([images[i] for i in escalate]))
+            if full_probs is None:
+                escalate = escalate[:0]
+            else:
+                probs[escalate] = full_probs
+
+        with self._lock:
+            self.requests += len(images)
+            self.escalated += len(escalate)
+
+        if self.log is not None:
+            version = self.version
+            escalated = set(escalate.tolist())
+            self.log.record([
+                (
+                    _key(image, version),
+                    "full" if i in escalated else "fast",
+                    self.class_names[int(fast_idx[i])],
+                    float(fast_conf[i]),
+                    self.class_names[int(probs[i].argmax())],
+                    float(probs[i].max() * 100),
+                    self.threshold,
+                )
+                for i, image in enumerate(images)
+            ])
+
+        return probs
+
+    def confirm(self, image, label):
+        if self.log is not None:
+            self.log.confirm(_key(image, self.version), label)
+
+    def classify(self, image, top_k=3):
+        return self.classify_many([image], top_k=top_k)[0]
+
+    def classify_many(self, images, top_k=3):
+        return [
+            top_predictions(probs, self.class_names, top_k)
+            for probs in self.predict(list(images))
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "escalated": self.escalated,
+                "escalation_rate": self.escalated / self.requests if self.requests else 0.0,
+                "threshold": self.threshold,
+                "label_error": self.label_error,
+            }
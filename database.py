@@ -68,6 +68,24 @@ def init_db(cursor, conn):
     )
     """)
 
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS training_images (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        path TEXT UNIQUE,
+        label TEXT,
+        size_bytes INTEGER,
+        phash TEXT,
+        source TEXT,
+        username TEXT,
+        created_at TEXT
+    )
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_training_images_label
+    ON training_images (label)
+    """)
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS sugar_logs (
         username TEXT,
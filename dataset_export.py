@@ -0,0 +1,199 @@
+import datetime
+import os
+import secrets
+import sqlite3
+import threading
+import zipfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+
+# Outside anything Streamlit serves: archives hold users' photos and only
+# reach an admin through the dashboard's download button
+EXPORTS_DIR = os.path.join(BASE_DIR, "exports")
+
+# Retention: newest archives kept on disk, and the oldest any of them may be
+KEEP_ARCHIVES = int(os.environ.get("EXPORT_KEEP_ARCHIVES", "3"))
+MAX_ARCHIVE_AGE_DAYS = float(os.environ.get("EXPORT_MAX_AGE_DAYS", "7"))
+
+
+def ensure_exports_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_exports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file TEXT,
+            kind TEXT,
+            first_image_id INTEGER,
+            last_image_id INTEGER,
+            images INTEGER,
+            size_bytes INTEGER,
+            created_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def prune_archives(conn, exports_dir=EXPORTS_DIR, keep=KEEP_ARCHIVES,
+                   max_age_days=MAX_ARCHIVE_AGE_DAYS):
+    # Only files are removed: the rows stay so deltas still start after the
+    # last exported image
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=max_age_days)
+    rows = conn.execute("SELECT file, created_at FROM dataset_exports ORDER BY id DESC").fetchall()
+
+    removed = 0
+    for position, (file, created_at) in enumerate(rows):
+        if position < keep and datetime.datetime.fromisoformat(created_at) >= cutoff:
+            continue
+        path = os.path.join(exports_dir, file)
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+
+    # Partial archives left by an interrupted export
+    if os.path.isdir(exports_dir):
+        for name in os.listdir(exports_dir):
+            path = os.path.join(exports_dir, name)
+            if name.endswith(".part") and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+    return removed
+
+
+# ---------------- BACKGROUND EXPORT JOB ----------------
+# Writes the images recorded in the training_images manifest since the last
+# export into a dated delta archive (or everything, for a full export).
+
+class ExportJob:
+    def __init__(self, db_path, full=False, dataset_dir=DATASET_DIR, exports_dir=EXPORTS_DIR):
+        self.db_path = db_path
+        self.full = full
+        self.dataset_dir = dataset_dir
+        self.exports_dir = exports_dir
+
+        self.status = "pending"
+        self.done = 0
+        self.total = 0
+        self.archive = None
+        self.error = None
+
+        self._thread = threading.Thread(target=self._run, name="dataset-export", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self.status in ("pending", "running")
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 0.0
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_exports_table(conn)
+            self.status = "running"
+
+            since = 0
+            if not self.full:
+                since = conn.execute(
+                    "SELECT COALESCE(MAX(last_image_id), 0) FROM dataset_exports"
+                ).fetchone()[0]
+
+            rows = conn.execute(
+                "SELECT id, path FROM training_images WHERE id > ? ORDER BY id",
+                (since,)
+            ).fetchall()
+            self.total = len(rows)
+
+            if not rows:
+                self.status = "nothing"
+                return
+
+            kind = "full" if self.full else "delta"
+            stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            name = f"user_training_data_{stamp}_{kind}_{secrets.token_urlsafe(12)}.zip"
+
+            os.makedirs(self.exports_dir, exist_ok=True)
+            path = os.path.join(self.exports_dir, name)
+            tmp_path = path + ".part"
+
+            images = 0
+            # JPEGs do not compress further: store them as-is
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as zipf:
+                for _, rel_path in rows:
+                    file_path = os.path.join(self.dataset_dir, rel_path)
+                    if os.path.exists(file_path):
+                        zipf.write(file_path, arcname=rel_path)
+                        images += 1
+                    self.done += 1
+
+            os.replace(tmp_path, path)
+
+            with conn:
+                conn.execute("""
+                    INSERT INTO dataset_exports
+                    (file, kind, first_image_id, last_image_id, images, size_bytes, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    name, kind, rows[0][0], rows[-1][0], images,
+                    os.path.getsize(path), datetime.datetime.now().isoformat()
+                ))
+
+            self.archive = name
+            self.status = "done"
+
+            prune_archives(conn, self.exports_dir)
+
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            conn.close()
+
+
+class ExportManager:
+    # One export at a time per process, shared by every admin session
+    def __init__(self, db_path, dataset_dir=DATASET_DIR, exports_dir=EXPORTS_DIR):
+        self.db_path = db_path
+        self.dataset_dir = dataset_dir
+        self.exports_dir = exports_dir
+        self.current = None
+        self._lock = threading.Lock()
+
+    def start(self, full=False):
+        with self._lock:
+            if self.current is not None and self.current.running:
+                return self.current
+            self.current = ExportJob(
+                self.db_path, full, self.dataset_dir, self.exports_dir
+            ).start()
+            return self.current
+
+    def archives(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_exports_table(conn)
+            # Archives also age out between exports
+            prune_archives(conn, self.exports_dir)
+            rows = conn.execute("""
+                SELECT file, kind, images, size_bytes, created_at
+                FROM dataset_exports
+                ORDER BY id DESC
+            """).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                "file": file,
+                "kind": kind,
+                "images": images,
+                "size_bytes": size_bytes,
+                "created_at": created_at,
+                "path": os.path.join(self.exports_dir, file),
+            }
+            for file, kind, images, size_bytes, created_at in rows
+            if os.path.exists(os.path.join(self.exports_dir, file))
+        ]
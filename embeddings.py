@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from model_utils import load_image_array, preprocess_image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_CACHE_DIR = os.path.join(BASE_DIR, "embedding_cache")
+
+
+# ---------------- BACKBONE / HEAD SPLIT ----------------
+def split_head(model):
+    # The classifier ends in a single Dense softmax layer; everything before
+    # it is the frozen feature extractor
+    import tensorflow as tf
+
+    head = model.layers[-1]
+    backbone = tf.keras.Model(model.inputs, head.input, name="food_backbone")
+    backbone.trainable = False
+    return backbone, head
+
+
+def load_backbone(model_path):
+    import tensorflow as tf
+
+    backbone, _ = split_head(tf.keras.models.load_model(model_path, compile=False))
+    return backbone
+
+
+def embed_images(backbone, images, batch_size=32):
+    if not len(images):
+        return np.zeros((0, backbone.output_shape[-1]), dtype="float32")
+
+    batch = np.concatenate([preprocess_image(image) for image in images])
+    return backbone.predict(batch, batch_size=batch_size, verbose=0).astype("float32")
+
+
+# ---------------- ON-DISK EMBEDDING CACHE ----------------
+# One .npy per image, keyed by the image content hash and stored under the
+# backbone version, so each image goes through the CNN once per backbone.
+
+def file_key(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, backbone_version, root=EMBEDDING_CACHE_DIR):
+        self.dir = os.path.join(root, backbone_version)
+
+    def _path(self, key):
+        return os.path.join(self.dir, key[:2], key + ".npy")
+
+    def get(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            return np.load(path)
+        return None
+
+    def put(self, key, vector):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, vector)
+        os.replace(tmp_path, path)
+
+    def embed_paths(self, backbone, paths, batch_size=32):
+        keys = [file_key(path) for path in paths]
+        vectors = [self.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            computed = embed_images(
+                backbone,
+                [load_image_array(paths[i]) for i in chunk],
+                batch_size=batch_size
+            )
+            for i, vector in zip(chunk, computed):
+                self.put(keys[i], vector)
+                vectors[i] = vector
+
+        return np.stack(vectors) if vectors else None, len(missing)
@@ -0,0 +1,153 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from adaptive_resolution import RESOLUTION_REPORT_PATH, variant_path
+from bench_inference import run_batch
+from inference_backends import KERAS_MODEL_PATH, load_backend, load_class_names
+from model_utils import IMG_SIZE, list_labeled_images, load_image_array
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+LABELS_PATH = os.path.join(BASE_DIR, "class_labels.json")
+
+
+# ---------------- EXPORT ----------------
+def build_at_resolution(model, size):
+    # Same layers and weights on a smaller input; needs a fully convolutional
+    # backbone ending in global pooling (no Flatten over a fixed grid)
+    import tensorflow as tf
+
+    inputs = tf.keras.Input(shape=(size, size, 3), name="image")
+    clone = tf.keras.models.clone_model(model, input_tensors=inputs)
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+# ---------------- ACCURACY VS LATENCY ----------------
+def measure(path, images, truths, repeats, batch_size=32):
+    backend = load_backend("keras", path)
+
+    preds, top3_hits = [], 0
+    for start in range(0, len(images), batch_size):
+        probs = run_batch(backend, images[start:start + batch_size])
+        preds.extend(probs.argmax(axis=1).tolist())
+        top3 = np.argsort(probs, axis=1)[:, -3:]
+        top3_hits += sum(int(t in row) for t, row in zip(truths[start:start + batch_size], top3))
+
+    single = [images[0]]
+    batch8 = [images[i % len(images)] for i in range(8)]
+    run_batch(backend, single)
+    run_batch(backend, batch8)
+
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        run_batch(backend, single)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    for _ in range(max(1, repeats // 4)):
+        run_batch(backend, batch8)
+    batch8_s = time.perf_counter() - t0
+
+    p50, p95 = np.percentile(timings, [50, 95])
+    return preds, {
+        "top1_accuracy": float(np.mean(np.array(preds) == np.array(truths))) if truths else None,
+        "top3_accuracy": top3_hits / len(truths) if truths else None,
+        "p50_ms_batch1": round(float(p50), 2),
+        "p95_ms_batch1": round(float(p95), 2),
+        "throughput_ips_batch8": round(8 * max(1, repeats // 4) / batch8_s, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the classifier at smaller input resolutions and report "
+                    "accuracy versus latency for each."
+    )
+    parser.add_argument("--model", default=KERAS_MODEL_PATH)
+    parser.add_argument("--labels", default=LABELS_PATH)
+    parser.add_argument("--sizes", default="192,160,128")
+    parser.add_argument("--data", default=DATASET_DIR)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--report", default=RESOLUTION_REPORT_PATH)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    class_names = load_class_names(args.labels)
+    by_lower = {name.lower(): i for i, name in enumerate(class_names)}
+    samples = [
+        (path, by_lower[label.lower()])
+        for path, label in list_labeled_images(args.data)
+        if label.lower() in by_lower
+    ][:args.limit]
+    if samples:
+        images = [load_image_array(path) for path, _ in samples]
+        truths = [truth for _, truth in samples]
+    else:
+        print(f"No labeled images under {args.data}; reporting latency only.")
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (480, 640, 3), dtype="uint8") for _ in range(8)]
+        truths = []
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+
+    paths = {IMG_SIZE: args.model}
+    for size in sorted({int(s) for s in args.sizes.split(",")} - {IMG_SIZE}, reverse=True):
+        try:
+            variant = build_at_resolution(model, size)
+        except Exception as e:
+            print(f"{size}px: cannot rebuild at this resolution ({e}); skipped")
+            continue
+        out_path = variant_path(size)
+        tmp_path = out_path + ".tmp.keras"
+        variant.save(tmp_path)
+        os.replace(tmp_path, out_path)
+        paths[size] = out_path
+        print(f"Saved {out_path}")
+
+    print(f"{'size':>6}{'top-1':>8}{'top-3':>8}{'agree':>8}{'p50 ms':>9}{'p95 ms':>9}{'img/s@8':>9}{'cost':>7}")
+
+    rows = []
+    reference = None
+    for size in sorted(paths, reverse=True):
+        preds, row = measure(paths[size], images, truths, args.repeats)
+        if reference is None:
+            reference = (preds, row["p50_ms_batch1"])
+        row = {
+            "size": size,
+            "path": paths[size],
+            **row,
+            "agreement_with_full": float(np.mean(np.array(preds) == np.array(reference[0]))),
+            "relative_cost": round(row["p50_ms_batch1"] / reference[1], 3),
+        }
+        rows.append(row)
+
+        fmt = lambda v: f"{v:.3f}" if v is not None else "-"
+        print(
+            f"{size:>6}{fmt(row['top1_accuracy']):>8}{fmt(row['top3_accuracy']):>8}"
+            f"{row['agreement_with_full']:>8.3f}{row['p50_ms_batch1']:>9.1f}"
+            f"{row['p95_ms_batch1']:>9.1f}{row['throughput_ips_batch8']:>9.1f}{row['relative_cost']:>7.2f}"
+        )
+
+    with open(args.report, "w") as f:
+        json.dump({
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "model": args.model,
+            "images": len(truths),
+            "resolutions": rows,
+        }, f, indent=2)
+    print(f"Wrote {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
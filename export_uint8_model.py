@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+from inference_backends import KERAS_MODEL_PATH, UINT8_MODEL_PATH
+from model_utils import (
+    IMG_SIZE,
+    list_labeled_images,
+    load_image_array,
+    preprocess_image,
+    resize_image,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+
+
+# ---------------- IN-GRAPH PREPROCESSING ----------------
+def build_uint8_model(model):
+    import tensorflow as tf
+
+    inputs = tf.keras.Input(shape=(None, None, 3), dtype="uint8", name="image")
+    x = tf.keras.layers.Rescaling(1.0 / 255, name="rescale")(inputs)
+    x = tf.keras.layers.Resizing(IMG_SIZE, IMG_SIZE, interpolation="bilinear", name="resize")(x)
+    outputs = model(x)
+    return tf.keras.Model(inputs, outputs, name="food_classifier_uint8")
+
+
+# ---------------- ALLOCATION MEASUREMENT ----------------
+def allocated_bytes(fn, image, repeats=20):
+    fn(image)
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(repeats):
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            fn(image)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - start
+    finally:
+        tracemalloc.stop()
+    return total / repeats
+
+
+def report_allocations(image):
+    uint8_path = lambda img: np.expand_dims(resize_image(img), axis=0)
+
+    float_bytes = allocated_bytes(preprocess_image, image)
+    uint8_bytes = allocated_bytes(uint8_path, image)
+
+    print("Python-side preprocessing, peak bytes allocated per request:")
+    print(f"  float32 path: {float_bytes / 1024:8.1f} KiB")
+    print(f"  uint8 path:   {uint8_bytes / 1024:8.1f} KiB")
+    print(f"  saved:        {(float_bytes - uint8_bytes) / 1024:8.1f} KiB per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Wrap the food classifier so it takes uint8 images and "
+                    "rescales/resizes in-graph."
+    )
+    parser.add_argument("--model", default=KERAS_MODEL_PATH)
+    parser.add_argument("--out", default=UINT8_MODEL_PATH)
+    parser.add_argument("--data", default=DATASET_DIR)
+    parser.add_argument("--check-images", type=int, default=16)
+    parser.add_argument("--min-top1", type=float, default=1.0)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    wrapped = build_uint8_model(model)
+
+    # Parity check against the existing float32 preprocessing
+    samples = list_labeled_images(args.data)[:args.check_images]
+    if samples:
+        images = [load_image_array(path) for path, _ in samples]
+        reference = model.predict(
+            np.concatenate([preprocess_image(img) for img in images]), verbose=0
+        )
+        candidate = wrapped.predict(np.stack([resize_image(img) for img in images]), verbose=0)
+
+        max_diff = float(np.max(np.abs(reference - candidate)))
+        top1 = float(np.mean(reference.argmax(axis=1) == candidate.argmax(axis=1)))
+        print(f"Parity on {len(images)} images: max |Δp| {max_diff:.5f}, top-1 agreement {top1:.3f}")
+        if top1 < args.min_top1:
+            print("Refusing to export: uint8 model disagrees with the float32 pipeline.")
+            return 1
+
+        report_allocations(images[0])
+    else:
+        print(f"No images under {args.data}; skipping parity check.")
+        report_allocations(np.zeros((378, 504, 3), dtype="uint8"))
+
+    tmp_path = args.out + ".tmp.keras"
+    wrapped.save(tmp_path)
+    os.replace(tmp_path, args.out)
+    print(f"Saved {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import json
+import os
+import socket
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(BASE_DIR, "host_profiles")
+
+
+# ---------------- PER-HOST INFERENCE PROFILE ----------------
+# Written by autotune.py, read at startup by the app and the inference
+# daemon. Explicit environment variables always take precedence.
+
+def host_id():
+    return f"{socket.gethostname()}-{os.cpu_count()}cpu"
+
+
+def profile_path():
+    return os.environ.get("AUTOTUNE_PROFILE") or os.path.join(PROFILE_DIR, f"{host_id()}.json")
+
+
+def load_host_profile(path=None):
+    try:
+        with open(path or profile_path(), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_host_profile(profile, path=None):
+    path = path or profile_path()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def apply_host_profile_env(profile):
+    # oneDNN is chosen when TensorFlow is imported, so this must run first
+    if profile.get("onednn") is not None:
+        os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "1" if profile["onednn"] else "0")
+
+
+def backend_options(profile, backend):
+    # Thread settings only carry over to the backend they were measured on
+    if profile.get("backend") != backend:
+        return {}
+    return {
+        "num_threads": profile.get("num_threads"),
+        "inter_op_threads": profile.get("inter_op_threads"),
+    }
@@ -0,0 +1,37 @@
+from PIL import Image, ImageOps
+
+from model_utils import IMG_SIZE
+
+# Uploads larger than this are rejected before any pixels are decoded
+MAX_UPLOAD_PIXELS = 50_000_000
+
+# Longest side kept after decoding (preview + saved training image)
+MAX_DECODED_SIDE = 1024
+
+
+# ---------------- REDUCED-SIZE DECODE ----------------
+# JPEG `draft` mode lets libjpeg scale by 1/2, 1/4 or 1/8 in the DCT domain,
+# so a 12 MP phone photo is decoded straight to ~0.2 MP instead of being
+# fully decoded, copied and then thrown away by the 224x224 resize.
+
+def load_image(file, target_size=IMG_SIZE, max_pixels=MAX_UPLOAD_PIXELS,
+               max_side=MAX_DECODED_SIDE):
+    image = Image.open(file)
+
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ValueError(
+            f"Image is too large ({width}x{height}); "
+            f"please upload a photo under {max_pixels // 1_000_000} megapixels."
+        )
+
+    # Keep both sides >= target_size so the model input is never upscaled
+    image.draft("RGB", (target_size, target_size))
+
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+
+    return image
@@ -0,0 +1,113 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+
+# Must never be imported before a page actually needs the model
+HEAVY_MODULES = ("tensorflow", "keras", "cv2", "plotly", "sklearn", "onnxruntime", "tflite_runtime")
+
+
+# ---------------- STARTUP IMPORTS ----------------
+def startup_imports(app_path=APP_PATH):
+    # Module-level imports of app.py are what a cold worker pays before the
+    # login form renders; imports inside page branches are excluded
+    with open(app_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def run_importtime(modules):
+    code = "; ".join(f"import {name}" for name in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return proc.stderr
+
+
+def parse_importtime(output):
+    # "import time:      self [us] |  cumulative | imported package"
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth,
+        })
+    return entries
+
+
+def build_report(entries, budget_ms):
+    # Top-level entries add up to the total
+    top_level = [e for e in entries if e["depth"] == 0]
+    total_ms = sum(e["cumulative_ms"] for e in top_level)
+    imported = {e["module"] for e in entries}
+    heavy = sorted(
+        name for name in imported
+        if name.split(".")[0] in HEAVY_MODULES
+    )
+
+    return {
+        "total_ms": round(total_ms, 1),
+        "budget_ms": budget_ms,
+        "within_budget": total_ms <= budget_ms and not heavy,
+        "heavy_modules_imported": heavy,
+        "slowest": sorted(
+            ({"module": e["module"], "cumulative_ms": round(e["cumulative_ms"], 1)} for e in top_level),
+            key=lambda e: e["cumulative_ms"],
+            reverse=True
+        )[:15],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the import time a cold worker spends before the login page renders."
+    )
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    modules = startup_imports()
+    report = build_report(parse_importtime(run_importtime(modules)), args.budget_ms)
+    report["modules"] = modules
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Startup imports: {', '.join(modules)}")
+        print(f"{'module':<40}{'cumulative ms':>15}")
+        for entry in report["slowest"]:
+            print(f"{entry['module']:<40}{entry['cumulative_ms']:>15.1f}")
+        print(f"Total: {report['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if report["heavy_modules_imported"]:
+            print(f"Heavy modules imported at startup: {', '.join(report['heavy_modules_imported'])}")
+        print("OK" if report["within_budget"] else "OVER BUDGET")
+
+    return 0 if report["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import contextlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from inference_queue import InferenceQueue
+from model_utils import IMG_SIZE, model_version, preprocess_image, resize_image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+KERAS_MODEL_PATH = os.path.join(BASE_DIR, "food_category_model.keras")
+
+# Same network with rescaling/resizing in-graph, fed uint8 pixels directly
+# (built by export_uint8_model.py); preferred whenever it has been exported
+UINT8_MODEL_PATH = os.path.join(BASE_DIR, "food_category_model_uint8.keras")
+
+DEFAULT_MODEL_PATHS = {
+    "keras": UINT8_MODEL_PATH if os.path.exists(UINT8_MODEL_PATH) else KERAS_MODEL_PATH,
+    "tflite": os.path.join(BASE_DIR, "food_category_model_dynamic.tflite"),
+    "onnx": os.path.join(BASE_DIR, "food_category_model.onnx"),
+}
+
+
+# ---------------- BACKENDS ----------------
+# Every backend takes an NHWC batch of whatever `prepare` produces and
+# returns class probabilities. Backends with `supports_features` can also
+# return the penultimate-layer features from the same forward pass.
+
+class Backend:
+    name = None
+    supports_features = False
+
+    # Square input side the network expects (models exported at other
+    # resolutions by export_resolutions.py report their own)
+    input_size = IMG_SIZE
+
+    def prepare(self, image):
+        return preprocess_image(image, self.input_size)[0]
+
+    def predict_with_features(self, batch):
+        raise NotImplementedError(f"{self.name} backend does not expose features")
+
+
+def _input_side(shape):
+    side = shape[1] if len(shape) == 4 else None
+    return int(side) if isinstance(side, (int, np.integer)) and side > 0 else IMG_SIZE
+
+
+def configure_tf_threads(intra_op=None, inter_op=None):
+    # Only takes effect before TensorFlow runs its first op
+    import tensorflow as tf
+
+    try:
+        if intra_op is not None:
+            tf.config.threading.set_intra_op_parallelism_threads(int(intra_op))
+        if inter_op is not None:
+            tf.config.threading.set_inter_op_parallelism_threads(int(inter_op))
+    except RuntimeError:
+        return False
+    return True
+
+
+def _with_features(model):
+    # Same graph with a second output: the input of the classification head
+    import tensorflow as tf
+
+    last = model.layers[-1]
+    if isinstance(last, tf.keras.Model):
+        # uint8 export: preprocessing layers wrapped around the original model
+        inner = _with_features(last)
+        return tf.keras.Model(model.inputs, inner(model.layers[-2].output))
+    return tf.keras.Model(model.inputs, [model.output, last.input])
+
+
+class KerasBackend(Backend):
+    name = "keras"
+
+    def __init__(self, path, num_threads=None, inter_op_threads=None):
+        import tensorflow as tf
+        from tensorflow.keras import backend as K
+
+        configure_tf_threads(num_threads, inter_op_threads)
+
+        self.path = path
+        K.clear_session()
+        self.model = tf.keras.models.load_model(path, compile=False)
+
+        input_dtype = self.model.inputs[0].dtype
+        self.takes_uint8 = getattr(input_dtype, "name", input_dtype) == "uint8"
+        self.input_size = _input_side(tuple(self.model.inputs[0].shape))
+
+        try:
+            self._dual = _with_features(self.model)
+        except Exception:
+            self._dual = None
+        self.supports_features = self._dual is not None
+
+    def prepare(self, image):
+        # uint8 models normalise in-graph: no float32 copy on the Python side
+        if self.takes_uint8:
+            return resize_image(image, self.input_size)
+        return preprocess_image(image, self.input_size)[0]
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+    def predict_with_features(self, batch):
+        if self._dual is None:
+            return super().predict_with_features(batch)
+        probs, features = self._dual.predict(batch, verbose=0)
+        return probs, features
+
+
+def _tflite_interpreter_class():
+    # The slim runtime is enough on app nodes; fall back to full TensorFlow
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend(Backend):
+    name = "tflite"
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+        self._refresh_details()
+        self.input_size = _input_side(tuple(self._input["shape"]))
+
+    def _refresh_details(self):
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    def _quantize_input(self, batch):
+        dtype = self._input["dtype"]
+        if np.issubdtype(dtype, np.integer):
+            scale, zero_point = self._input["quantization"]
+            info = np.iinfo(dtype)
+            batch = np.round(batch / scale + zero_point)
+            return np.clip(batch, info.min, info.max).astype(dtype)
+        return batch.astype(dtype, copy=False)
+
+    def _dequantize_output(self, output):
+        if np.issubdtype(output.dtype, np.integer):
+            scale, zero_point = self._output["quantization"]
+            return (output.astype("float32") - zero_point) * scale
+        return output
+
+    def predict(self, batch):
+        batch = np.asarray(batch)
+
+        with self._lock:
+            if tuple(self._input["shape"]) != batch.shape:
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._refresh_details()
+
+            self.interpreter.set_tensor(self._input["index"], self._quantize_input(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output["index"]).copy()
+
+        return self._dequantize_output(output)
+
+
+class OnnxBackend(Backend):
+    name = "onnx"
+
+    def __init__(self, path, num_threads=None, inter_op_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = int(num_threads)
+        if inter_op_threads is not None:
+            options.inter_op_num_threads = int(inter_op_threads)
+
+        self.path = path
+        self.session = ort.InferenceSession(
+            path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.session.get_inputs()[0].name
+        self.input_size = _input_side(tuple(self.session.get_inputs()[0].shape))
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype="float32")
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def load_backend(name, path=None, **options):
+    # options: num_threads (all backends), inter_op_threads (keras/onnx)
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown inference backend '{name}' (choose from {', '.join(BACKENDS)})"
+        )
+    if name == "tflite":
+        options.pop("inter_op_threads", None)
+    return BACKENDS[name](path or DEFAULT_MODEL_PATHS[name], **options)
+
+
+# ---------------- LABELS ----------------
+def load_class_names(labels_path):
+    with open(labels_path, "r") as f:
+        class_indices = json.load(f)
+
+    # Reverse mapping: index → class name
+    class_names = [None] * len(class_indices)
+    for name, index in class_indices.items():
+        class_names[index] = name
+    return class_names
+
+
+def top_predictions(probs, class_names, k=3):
+    top_indices = np.argsort(probs)[-k:][::-1]
+    return [
+        (class_names[i], float(probs[i] * 100))
+        for i in top_indices
+    ]
+
+
+# ---------------- CLASSIFIER ----------------
+# Page code only talks to this: images in, ranked (label, confidence %) out.
+# Requests from every session share one micro-batching queue per backend.
+# With `with_features` (and a backend that supports it) the queue runs the
+# dual-output model so embeddings come from the same pass as the prediction.
+
+class FoodClassifier:
+    def __init__(self, backend, class_names, max_batch_size=16, max_wait_ms=5.0, latency=None,
+                 with_features=False):
+        self.backend = backend
+        self.class_names = class_names
+        self.latency = latency
+        self.with_features = bool(with_features and backend.supports_features)
+        self.queue = InferenceQueue(
+            backend.predict_with_features if self.with_features else backend.predict,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+        self._version = None
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = f"{self.backend.name}:{model_version(self.backend.path)}"
+        return self._version
+
+    def _timed(self, stage):
+        if self.latency is None:
+            return contextlib.nullcontext()
+        return self.latency.time(stage)
+
+    def predict(self, images):
+        return self.predict_with_features(images)[0]
+
+    def predict_with_features(self, images):
+        # features is None unless this classifier was built with_features
+        with self._timed("preprocess"):
+            processed = [self.backend.prepare(np.asarray(image)) for image in images]
+        # Includes the wait for other sessions' requests to join the batch
+        with self._timed("predict"):
+            rows = self.queue.predict_many(processed)
+        if not self.with_features:
+            return np.stack(rows), None
+        return np.stack([probs for probs, _ in rows]), np.stack([features for _, features in rows])
+
+    def classify(self, image, top_k=3):
+        return self.classify_many([image], top_k=top_k)[0]
+
+    def close(self):
+        self.queue.close()
+
+    def classify_with_embedding(self, image, top_k=3):
+        probs, features = self.predict_with_features([image])
+        embedding = features[0] if features is not None else None
+        return top_predictions(probs[0], self.class_names, top_k), embedding
+
+    def classify_many(self, images, top_k=3):
+        return [
+            top_predictions(probs, self.class_names, top_k)
+            for probs in self.predict(images)
+        ]
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Queued after the last request by close(); tells the worker thread to exit
+_CLOSE = object()
+
+
+# ---------------- CROSS-SESSION MICRO-BATCHING ----------------
+# Every Streamlit session submits single preprocessed images here. One worker
+# thread waits up to `max_wait_ms` for more requests to arrive, stacks them
+# into one batch and runs a single forward pass, so concurrent clicks share
+# the model instead of queueing batch-of-one predict calls. close() lets the
+# worker finish what is already queued and then exit, releasing the model.
+
+class InferenceQueue:
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._recent_batch_sizes = deque(maxlen=1000)
+        self._batch_size_counts = Counter()
+        self._total_batches = 0
+        self._total_requests = 0
+        self._closed = False
+        self._closing = False
+
+        self._worker = threading.Thread(
+            target=self._run,
+            name="inference-queue",
+            daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, image):
+        if self._closed:
+            raise RuntimeError("inference queue is closed")
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def submit_many(self, images):
+        return [self.submit(image) for image in images]
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def predict(self, image, timeout=None):
+        return self.submit(image).result(timeout=timeout)
+
+    def predict_many(self, images, timeout=None):
+        return [f.result(timeout=timeout) for f in self.submit_many(images)]
+
+    def close(self, timeout=None):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._worker.join(timeout)
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        if first is _CLOSE:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _CLOSE:
+                self._closing = True
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while not self._closing:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+
+            # Drop requests whose caller already gave up
+            batch = [
+                (image, future) for image, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            try:
+                preds = self.predict_fn(np.stack([image for image, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if isinstance(preds, tuple):
+                # Several outputs (e.g. probabilities and features): each
+                # request gets its own row of every one
+                preds = list(zip(*preds))
+
+            for (_, future), pred in zip(batch, preds):
+                future.set_result(pred)
+
+            with self._lock:
+                self._total_batches += 1
+                self._total_requests += len(batch)
+                self._recent_batch_sizes.append(len(batch))
+                self._batch_size_counts[len(batch)] += 1
+
+        # Anything that raced in behind the sentinel
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _CLOSE and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("inference queue is closed"))
+
+    def stats(self):
+        with self._lock:
+            recent = list(self._recent_batch_sizes)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "total_requests": self._total_requests,
+                "total_batches": self._total_batches,
+                "avg_batch_size": float(np.mean(recent)) if recent else 0.0,
+                "max_batch_size": max(recent) if recent else 0,
+                "batch_size_histogram": dict(sorted(self._batch_size_counts.items())),
+                "max_batch_size_limit": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
@@ -0,0 +1,391 @@
+import argparse
+import contextlib
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import time
+
+import numpy as np
+
+from host_profile import apply_host_profile_env, backend_options, load_host_profile
+from inference_backends import FoodClassifier, load_backend, load_class_names, top_predictions
+from model_registry import REGISTRY_DIR, RegistryClassifier, ShadowLog
+from model_utils import resize_image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LABELS_PATH = os.path.join(BASE_DIR, "class_labels.json")
+DEFAULT_SOCKET_PATH = "/tmp/food_inference.sock"
+
+# Framing: 8-byte header (JSON length, payload length) + JSON + raw payload
+_FRAME = struct.Struct("!II")
+
+
+# ---------------- WIRE PROTOCOL ----------------
+def send_message(sock, header, payload=b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(data), len(payload)) + data + payload)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("inference socket closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_message(sock):
+    header_len, payload_len = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_len))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+def _attach_shared_memory(name):
+    from multiprocessing import shared_memory
+
+    try:
+        # Python 3.13+: the client owns the segment, do not track it here
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _predict_served(classifier, images, features=False):
+    # (classifier that answered, probabilities, features or None)
+    served = getattr(classifier, "predict_served", None)
+    if served is not None:
+        return served(images, features=features)
+    if features and hasattr(classifier, "predict_with_features"):
+        return (classifier, *classifier.predict_with_features(images))
+    return classifier, classifier.predict(images), None
+
+
+# ---------------- SERVER ----------------
+# One process holds the model; every Streamlit worker on the box connects
+# over a Unix socket. Image batches travel through shared memory, and the
+# server's micro-batching queue merges requests from all workers.
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        classifier = self.server.classifier
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            try:
+                if header["op"] == "info":
+                    send_message(self.request, {
+                        "ok": True,
+                        "version": classifier.version,
+                        "class_names": classifier.class_names,
+                    })
+
+                elif header["op"] == "stats":
+                    send_message(self.request, {"ok": True, "stats": classifier.queue.stats()})
+
+                elif header["op"] == "predict":
+                    shm = _attach_shared_memory(header["shm"])
+                    try:
+                        images = np.ndarray(
+                            header["shape"], dtype=header["dtype"], buffer=shm.buf
+                        ).copy()
+                    finally:
+                        shm.close()
+
+                    # Version and labels come from the model that actually
+                    # served this batch, which may have just been hot-swapped.
+                    # Penultimate features from the same pass are appended
+                    # after the probabilities (absent if the model has none)
+                    served, probs, features = _predict_served(
+                        classifier, list(images), bool(header.get("features"))
+                    )
+                    reply = {
+                        "ok": True,
+                        "version": served.version,
+                        "class_names": list(served.class_names),
+                    }
+                    probs = np.asarray(probs, dtype="float32")
+                    payload = probs.tobytes()
+                    if features is not None:
+                        features = np.asarray(features, dtype="float32")
+                        reply["feature_shape"] = list(features.shape)
+                        payload += features.tobytes()
+                    reply["shape"] = list(probs.shape)
+                    send_message(self.request, reply, payload)
+
+                else:
+                    send_message(self.request, {"ok": False, "error": f"unknown op {header['op']}"})
+
+            except Exception as e:
+                send_message(self.request, {"ok": False, "error": str(e)})
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, classifier):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.classifier = classifier
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+
+# ---------------- CLIENT ----------------
+class _Connection:
+    def __init__(self, socket_path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.shm = None
+
+    def buffer(self, nbytes):
+        # Reuse one segment per connection, growing it when a bigger batch comes
+        from multiprocessing import shared_memory
+
+        if self.shm is None or self.shm.size < nbytes:
+            self.close_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1 << 20))
+        return self.shm
+
+    def close_shm(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self.close_shm()
+        with contextlib.suppress(OSError):
+            self.sock.close()
+
+
+class _RemoteQueue:
+    def __init__(self, client):
+        self.client = client
+
+    def stats(self):
+        return self.client.remote_stats()
+
+    def depth(self):
+        return self.stats()["queue_depth"]
+
+
+class RemoteClassifier:
+    # Same interface as FoodClassifier. If the daemon is unreachable the
+    # `fallback` factory provides an in-process classifier, and the daemon is
+    # retried after `retry_after` seconds.
+
+    def __init__(self, socket_path, fallback=None, timeout=30.0, retry_after=10.0,
+                 latency=None):
+        self.socket_path = socket_path
+        self.fallback = fallback
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.latency = latency
+
+        self._pool = queue.LifoQueue()
+        self._info = None
+        self._down_until = 0.0
+        self.queue = _RemoteQueue(self)
+
+    # ---------- connection handling ----------
+    def _call(self, header, payload_fn=None):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = _Connection(self.socket_path, self.timeout)
+
+        try:
+            payload = b""
+            if payload_fn is not None:
+                header = payload_fn(conn, header)
+            send_message(conn.sock, header, payload)
+            reply, data = recv_message(conn.sock)
+        except Exception:
+            conn.close()
+            raise
+
+        self._pool.put(conn)
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "inference daemon error"))
+        return reply, data
+
+    def _available(self):
+        # The daemon's info, or None while it is down. Callers use this one
+        # snapshot: other analysis threads may reset self._info meanwhile
+        if time.monotonic() < self._down_until:
+            return None
+        info = self._info
+        if info is None:
+            try:
+                info, _ = self._call({"op": "info"})
+            except (OSError, ConnectionError):
+                self._mark_down()
+                return None
+            self._info = info
+        return info
+
+    def _mark_down(self):
+        self._info = None
+        self._down_until = time.monotonic() + self.retry_after
+
+    def _local(self):
+        if self.fallback is None:
+            raise ConnectionError(f"inference daemon at {self.socket_path} is not reachable")
+        return self.fallback()
+
+    @property
+    def using_daemon(self):
+        return self._available() is not None
+
+    # ---------- classifier interface ----------
+    @property
+    def class_names(self):
+        info = self._available()
+        if info is not None:
+            return info["class_names"]
+        return self._local().class_names
+
+    @property
+    def version(self):
+        info = self._available()
+        if info is not None:
+            return info["version"]
+        return self._local().version
+
+    def _timed(self, stage):
+        if self.latency is None:
+            return contextlib.nullcontext()
+        return self.latency.time(stage)
+
+    def predict(self, images):
+        return self._predict(images, features=False)[0]
+
+    def predict_with_features(self, images):
+        return self._predict(images, features=True)[:2]
+
+    def _predict(self, images, features):
+        # (probabilities, features or None, class names of the model that served them)
+        if self._available() is None:
+            return self._local_predict(images, features)
+
+        with self._timed("preprocess"):
+            batch = np.stack([resize_image(np.asarray(image)) for image in images])
+
+        def write_batch(conn, header):
+            shm = conn.buffer(batch.nbytes)
+            np.ndarray(batch.shape, dtype=batch.dtype, buffer=shm.buf)[:] = batch
+            return {**header, "shm": shm.name, "shape": list(batch.shape), "dtype": str(batch.dtype)}
+
+        try:
+            with self._timed("predict"):
+                reply, data = self._call({"op": "predict", "features": features}, write_batch)
+        except (OSError, ConnectionError):
+            self._mark_down()
+            return self._local_predict(images, features)
+
+        # Keeps version/class_names current after a hot-swap in the daemon
+        self._info = {"ok": True, "version": reply["version"], "class_names": reply["class_names"]}
+
+        values = np.frombuffer(data, dtype="float32")
+        n_probs = int(np.prod(reply["shape"]))
+        probs = values[:n_probs].reshape(reply["shape"])
+        embeddings = None
+        if "feature_shape" in reply:
+            embeddings = values[n_probs:].reshape(reply["feature_shape"])
+        return probs, embeddings, reply["class_names"]
+
+    def _local_predict(self, images, features):
+        served, probs, embeddings = _predict_served(self._local(), list(images), features)
+        return probs, embeddings, served.class_names
+
+    def predict_labeled(self, images):
+        probs, _, class_names = self._predict(images, features=False)
+        return class_names, probs
+
+    def classify(self, image, top_k=3):
+        return self.classify_many([image], top_k=top_k)[0]
+
+    def classify_many(self, images, top_k=3):
+        probs, _, class_names = self._predict(images, features=False)
+        return [top_predictions(p, class_names, top_k) for p in probs]
+
+    def classify_with_embedding(self, image, top_k=3):
+        probs, features, class_names = self._predict([image], features=True)
+        embedding = features[0] if features is not None else None
+        return top_predictions(probs[0], class_names, top_k), embedding
+
+    def remote_stats(self):
+        if self._available() is not None:
+            try:
+                return self._call({"op": "stats"})[0]["stats"]
+            except (OSError, ConnectionError):
+                self._mark_down()
+        return self._local().queue.stats()
+
+
+def main():
+    profile = load_host_profile()
+    apply_host_profile_env(profile)
+
+    parser = argparse.ArgumentParser(
+        description="Serve the food classifier to local Streamlit workers over a Unix socket."
+    )
+    parser.add_argument("--socket", default=os.environ.get("INFERENCE_SOCKET", DEFAULT_SOCKET_PATH))
+    parser.add_argument("--backend", default=os.environ.get("INFERENCE_BACKEND", "keras"))
+    parser.add_argument("--model", default=os.environ.get("INFERENCE_MODEL_PATH") or None)
+    parser.add_argument("--max-batch-size", type=int,
+                        default=int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", profile.get("batch_size", 16))))
+    parser.add_argument("--max-wait-ms", type=float,
+                        default=float(os.environ.get("INFERENCE_MAX_WAIT_MS", "5")))
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY_DIR", REGISTRY_DIR))
+    parser.add_argument("--shadow-db", default=os.path.join(BASE_DIR, "users.db"))
+    parser.add_argument("--features", action="store_true",
+                        default=os.environ.get("SIMILAR_MEALS", "0") == "1",
+                        help="also return penultimate-layer embeddings (for similar-meal lookup)")
+    args = parser.parse_args()
+
+    def build(entry, shadow=False):
+        if entry is None:
+            backend, model_path, labels_path = args.backend, args.model, LABELS_PATH
+        else:
+            backend, model_path, labels_path = entry["backend"], entry["model_path"], entry["labels_path"]
+        return FoodClassifier(
+            load_backend(backend, model_path, **backend_options(profile, backend)),
+            load_class_names(labels_path),
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms,
+            with_features=args.features and not shadow
+        )
+
+    classifier = RegistryClassifier(build, registry_dir=args.registry, shadow_log=ShadowLog(args.shadow_db))
+    print(f"Loaded {classifier.version}; listening on {args.socket}")
+
+    server = InferenceServer(args.socket, classifier)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
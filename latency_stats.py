@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# ---------------- PER-STAGE LATENCY TRACKING ----------------
+# Each stage keeps a rolling window of its most recent durations (measured
+# with the monotonic perf_counter) for p50/p95/p99, plus a bounded event log
+# that can be exported as JSON lines for offline analysis.
+
+class LatencyTracker:
+    def __init__(self, window=2048, max_events=50_000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    def record(self, stage, ms):
+        with self._lock:
+            self._samples[stage].append(ms)
+            self._counts[stage] += 1
+            self._events.append({"ts": time.time(), "stage": stage, "ms": round(ms, 3)})
+
+    def summary(self):
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        rows = []
+        for stage, values in samples.items():
+            if not len(values):
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            rows.append({
+                "stage": stage,
+                "count": counts[stage],
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(values.max()), 2),
+            })
+        return rows
+
+    def export_jsonl(self):
+        with self._lock:
+            events = list(self._events)
+        return "".join(json.dumps(event) + "\n" for event in events)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._events.clear()
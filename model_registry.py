@@ -0,0 +1,486 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_backends import top_predictions
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.path.join(BASE_DIR, "models", "registry")
+
+# Pointer files: CURRENT is the live version, CANDIDATE is shadow-evaluated
+CURRENT = "CURRENT"
+CANDIDATE = "CANDIDATE"
+
+MODEL_EXTENSIONS = {"keras": ".keras", "tflite": ".tflite", "onnx": ".onnx"}
+
+
+# ---------------- REGISTRY LAYOUT ----------------
+# models/registry/<version>/model.<ext>, class_labels.json, meta.json
+# Versions are immutable once registered; promoting only rewrites a pointer,
+# and every write goes through a temp name + rename so readers never see a
+# half-written file.
+
+def _write_pointer(registry_dir, name, version):
+    path = os.path.join(registry_dir, name)
+    if version is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, path)
+
+
+def _read_pointer(registry_dir, name):
+    try:
+        with open(os.path.join(registry_dir, name), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    return _read_pointer(registry_dir, CURRENT)
+
+
+def candidate_version(registry_dir=REGISTRY_DIR):
+    return _read_pointer(registry_dir, CANDIDATE)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+
+    versions = []
+    for name in sorted(os.listdir(registry_dir)):
+        meta_path = os.path.join(registry_dir, name, "meta.json")
+        if os.path.isfile(meta_path):
+            with open(meta_path, "r") as f:
+                versions.append(json.load(f))
+    return sorted(versions, key=lambda meta: meta["created_at"])
+
+
+def resolve(version, registry_dir=REGISTRY_DIR):
+    version_dir = os.path.join(registry_dir, version)
+    with open(os.path.join(version_dir, "meta.json"), "r") as f:
+        meta = json.load(f)
+    return {
+        **meta,
+        "model_path": os.path.join(version_dir, meta["model_file"]),
+        "labels_path": os.path.join(version_dir, "class_labels.json"),
+    }
+
+
+def register(model_path, labels_path, backend="keras", version=None, notes="",
+             registry_dir=REGISTRY_DIR):
+    if backend not in MODEL_EXTENSIONS:
+        raise ValueError(f"Unknown backend '{backend}'")
+
+    if version is None:
+        existing = {meta["version"] for meta in list_versions(registry_dir)}
+        n = len(existing) + 1
+        while f"v{n}" in existing:
+            n += 1
+        version = f"v{n}"
+
+    version_dir = os.path.join(registry_dir, version)
+    if os.path.exists(version_dir):
+        raise ValueError(f"Version '{version}' is already registered")
+
+    # Stage everything, then one rename publishes the version
+    staging_dir = os.path.join(registry_dir, f".staging-{version}-{os.getpid()}")
+    os.makedirs(staging_dir)
+    model_file = "model" + MODEL_EXTENSIONS[backend]
+    if os.path.isdir(model_path):
+        shutil.copytree(model_path, os.path.join(staging_dir, model_file))
+    else:
+        shutil.copy2(model_path, os.path.join(staging_dir, model_file))
+    shutil.copy2(labels_path, os.path.join(staging_dir, "class_labels.json"))
+
+    with open(os.path.join(staging_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": version,
+            "backend": backend,
+            "model_file": model_file,
+            "source": os.path.abspath(model_path),
+            "notes": notes,
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }, f, indent=4)
+
+    os.rename(staging_dir, version_dir)
+    return version
+
+
+def promote(version, registry_dir=REGISTRY_DIR):
+    resolve(version, registry_dir)
+    _write_pointer(registry_dir, CURRENT, version)
+    if candidate_version(registry_dir) == version:
+        _write_pointer(registry_dir, CANDIDATE, None)
+
+
+def set_candidate(version, registry_dir=REGISTRY_DIR):
+    if version is not None:
+        resolve(version, registry_dir)
+    _write_pointer(registry_dir, CANDIDATE, version)
+
+
+# ---------------- SHADOW LOG ----------------
+def ensure_shadow_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shadow_evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            live_version TEXT,
+            candidate_version TEXT,
+            images INTEGER,
+            agreements INTEGER,
+            live_ms REAL,
+            candidate_ms REAL,
+            created_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+class ShadowLog:
+    def __init__(self, db_path):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            ensure_shadow_table(self._conn)
+
+    def record(self, live_version, candidate_version, images, agreements, live_ms, candidate_ms):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO shadow_evaluations
+                (live_version, candidate_version, images, agreements, live_ms, candidate_ms, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    live_version, candidate_version, images, agreements,
+                    live_ms, candidate_ms,
+                    datetime.datetime.now().isoformat(timespec="seconds")
+                )
+            )
+            self._conn.commit()
+
+    def summary(self):
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT live_version, candidate_version,
+                       SUM(images), SUM(agreements),
+                       SUM(live_ms) / SUM(images), SUM(candidate_ms) / SUM(images),
+                       MAX(created_at)
+                FROM shadow_evaluations
+                GROUP BY live_version, candidate_version
+                ORDER BY MAX(created_at) DESC
+            """).fetchall()
+
+        return [
+            {
+                "live_version": live,
+                "candidate_version": candidate,
+                "images": images,
+                "agreement": agreements / images if images else 0.0,
+                "live_ms_per_image": live_ms,
+                "candidate_ms_per_image": candidate_ms,
+                "last_seen": last_seen,
+            }
+            for live, candidate, images, agreements, live_ms, candidate_ms, last_seen in rows
+        ]
+
+
+# ---------------- HOT-SWAPPING CLASSIFIER ----------------
+# Wraps the classifier for the CURRENT registry version. The pointers are
+# re-read at most every `check_every` seconds; a new version is loaded in the
+# background and swapped in with one reference assignment, so requests in
+# flight finish on the model they started with. `build(entry, shadow)` turns
+# a registry entry (None = the built-in default model) into a classifier.
+#
+# A CANDIDATE version scores the same images on a single background thread;
+# when it falls behind, batches are skipped rather than queued.
+
+class RegistryClassifier:
+    def __init__(self, build, registry_dir=REGISTRY_DIR, check_every=5.0,
+                 shadow_log=None, max_shadow_pending=4):
+        self.build = build
+        self.registry_dir = registry_dir
+        self.check_every = check_every
+        self.shadow_log = shadow_log
+        self.max_shadow_pending = max_shadow_pending
+
+        self._lock = threading.Lock()
+        self._loading = set()
+        self._next_check = 0.0
+        self.load_error = None
+
+        # (registry version, classifier) pairs, replaced as a whole on swap
+        version = current_version(registry_dir)
+        self._live = (version, build(self._entry(version), False))
+        self._candidate = (None, None)
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow-eval")
+        self._shadow_pending = 0
+
+        # id(classifier) -> calls running on it; replaced classifiers wait in
+        # _retired until theirs reaches zero
+        self._in_flight = Counter()
+        self._retired = []
+
+    def _entry(self, version):
+        return resolve(version, self.registry_dir) if version else None
+
+    # ---------- pointer polling ----------
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_every
+
+        live = current_version(self.registry_dir)
+        if live != self.active_version:
+            self._load_async("live", live)
+
+        candidate = candidate_version(self.registry_dir)
+        if candidate == live:
+            candidate = None
+        if candidate != self.candidate_version:
+            if candidate is None:
+                self._swap("candidate", (None, None))
+            else:
+                self._load_async("candidate", candidate)
+
+    def _load_async(self, role, version):
+        with self._lock:
+            if (role, version) in self._loading:
+                return
+            self._loading.add((role, version))
+
+        def run():
+            try:
+                classifier = self.build(self._entry(version), role == "candidate")
+            except Exception as e:
+                self.load_error = f"{role} {version}: {e}"
+                return
+            finally:
+                with self._lock:
+                    self._loading.discard((role, version))
+
+            self._swap(role, (version, classifier))
+            self.load_error = None
+
+        threading.Thread(target=run, name=f"registry-load-{role}", daemon=True).start()
+
+    # ---------- retiring replaced models ----------
+    # Requests check a classifier out under the lock, so once it has been
+    # swapped out and its count drops to zero nothing can reach it again;
+    # it is then closed, which stops its queue thread and frees the model.
+    def _swap(self, role, entry):
+        with self._lock:
+            if role == "live":
+                old, self._live = self._live[1], entry
+            else:
+                old, self._candidate = self._candidate[1], entry
+            if old is not None:
+                self._retired.append(old)
+        self._close_retired()
+
+    def _checkout(self, role="live"):
+        with self._lock:
+            entry = self._live if role == "live" else self._candidate
+            if entry[1] is not None:
+                self._in_flight[id(entry[1])] += 1
+            return entry
+
+    def _checkin(self, classifier):
+        with self._lock:
+            self._in_flight[id(classifier)] -= 1
+            if self._in_flight[id(classifier)] <= 0:
+                del self._in_flight[id(classifier)]
+        self._close_retired()
+
+    def _close_retired(self):
+        with self._lock:
+            idle = [c for c in self._retired if not self._in_flight[id(c)]]
+            self._retired = [c for c in self._retired if self._in_flight[id(c)]]
+        for classifier in idle:
+            close = getattr(classifier, "close", None)
+            if close is not None:
+                close()
+
+    @property
+    def active_version(self):
+        return self._live[0]
+
+    @property
+    def candidate_version(self):
+        return self._candidate[0]
+
+    @property
+    def live(self):
+        return self._live[1]
+
+    # ---------- classifier interface ----------
+    @property
+    def class_names(self):
+        return self._live[1].class_names
+
+    @property
+    def version(self):
+        return self._live[1].version
+
+    @property
+    def queue(self):
+        return self._live[1].queue
+
+    def predict(self, images):
+        return self.predict_served(images)[1]
+
+    def predict_with_features(self, images):
+        return self.predict_served(images, features=True)[1:]
+
+    def predict_labeled(self, images):
+        classifier, probs, _ = self.predict_served(images)
+        return classifier.class_names, probs
+
+    def predict_served(self, images, features=False):
+        # Returns the classifier that served the call, so label names and
+        # version always come from the same model as the probabilities
+        images = list(images)
+        self._refresh()
+
+        live = self._checkout()
+        try:
+            start = time.perf_counter()
+            if features and hasattr(live[1], "predict_with_features"):
+                probs, embeddings = live[1].predict_with_features(images)
+            else:
+                probs, embeddings = live[1].predict(images), None
+            live_ms = (time.perf_counter() - start) * 1000
+
+            self._shadow(live, images, probs, live_ms)
+        finally:
+            self._checkin(live[1])
+        return live[1], probs, embeddings
+
+    def _shadow(self, live, images, probs, live_ms):
+        if self._candidate[1] is None:
+            return
+
+        with self._lock:
+            if self._shadow_pending >= self.max_shadow_pending:
+                return
+            self._shadow_pending += 1
+
+        candidate_version, candidate = self._checkout("candidate")
+        if candidate is None:
+            with self._lock:
+                self._shadow_pending -= 1
+            return
+
+        live_version, active = live
+        live_labels = [active.class_names[int(p.argmax())].lower() for p in probs]
+
+        def run():
+            try:
+                start = time.perf_counter()
+                candidate_probs = candidate.predict(images)
+                candidate_ms = (time.perf_counter() - start) * 1000
+
+                agreements = sum(
+                    candidate.class_names[int(p.argmax())].lower() == label
+                    for p, label in zip(candidate_probs, live_labels)
+                )
+                if self.shadow_log is not None:
+                    self.shadow_log.record(
+                        live_version or "default", candidate_version, len(images),
+                        agreements, live_ms, candidate_ms
+                    )
+            except Exception:
+                pass
+            finally:
+                self._checkin(candidate)
+                with self._lock:
+                    self._shadow_pending -= 1
+
+        self._shadow_pool.submit(run)
+
+    def classify(self, image, top_k=3):
+        return self.classify_many([image], top_k=top_k)[0]
+
+    def classify_many(self, images, top_k=3):
+        classifier, probs, _ = self.predict_served(images)
+        return [top_predictions(p, classifier.class_names, top_k) for p in probs]
+
+    def classify_with_embedding(self, image, top_k=3):
+        classifier, probs, embeddings = self.predict_served([image], features=True)
+        embedding = embeddings[0] if embeddings is not None else None
+        return top_predictions(probs[0], classifier.class_names, top_k), embedding
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned classifier models.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("register", help="copy a model + labels in as a new version")
+    p.add_argument("model")
+    p.add_argument("labels")
+    p.add_argument("--backend", default="keras", choices=sorted(MODEL_EXTENSIONS))
+    p.add_argument("--version")
+    p.add_argument("--notes", default="")
+    p.add_argument("--promote", action="store_true")
+    p.add_argument("--shadow", action="store_true", help="make it the shadow candidate")
+
+    p = sub.add_parser("promote", help="make a version live")
+    p.add_argument("version")
+
+    p = sub.add_parser("shadow", help="shadow-evaluate a version (omit to stop)")
+    p.add_argument("version", nargs="?")
+
+    sub.add_parser("list", help="show registered versions")
+
+    args = parser.parse_args()
+    os.makedirs(args.registry, exist_ok=True)
+
+    if args.command == "register":
+        version = register(
+            args.model, args.labels, backend=args.backend, version=args.version,
+            notes=args.notes, registry_dir=args.registry
+        )
+        print(f"Registered {version}")
+        if args.promote:
+            promote(version, args.registry)
+            print(f"Promoted {version}")
+        elif args.shadow:
+            set_candidate(version, args.registry)
+            print(f"Shadowing {version}")
+
+    elif args.command == "promote":
+        promote(args.version, args.registry)
+        print(f"Promoted {args.version}")
+
+    elif args.command == "shadow":
+        set_candidate(args.version, args.registry)
+        print(f"Shadowing {args.version}" if args.version else "Shadow evaluation stopped")
+
+    else:
+        live = current_version(args.registry)
+        candidate = candidate_version(args.registry)
+        for meta in list_versions(args.registry):
+            marker = "*" if meta["version"] == live else ("s" if meta["version"] == candidate else " ")
+            print(f"{marker} {meta['version']:<8} {meta['backend']:<7} {meta['created_at']}  {meta['notes']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import hashlib
+import os
+
+import numpy as np
+
+IMG_SIZE = 224
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+# ---------------- PREPROCESSING ----------------
+def resize_image(image, size=IMG_SIZE):
+    import cv2
+
+    return cv2.resize(image, (size, size))
+
+
+def preprocess_image(image, size=IMG_SIZE):
+    image = resize_image(image, size)
+    image = image.astype("float32") / 255.0
+    return np.expand_dims(image, axis=0)
+
+
+def load_image_array(path):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return np.array(image.convert("RGB"))
+
+
+# ---------------- LABELED IMAGE FOLDERS ----------------
+# Folders laid out like user_added_data/<label>/<image>.jpg
+def list_labeled_images(root):
+    samples = []
+    if not os.path.isdir(root):
+        return samples
+
+    for label in sorted(os.listdir(root)):
+        label_dir = os.path.join(root, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(label_dir, name), label))
+
+    return samples
+
+
+# ---------------- MODEL VERSION ----------------
+def model_version(path, chunk_size=1 << 20):
+    if not os.path.exists(path):
+        return "missing"
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+
+    return h.hexdigest()[:16]
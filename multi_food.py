@@ -0,0 +1,63 @@
+import numpy as np
+
+# Labels that describe a whole plate; dropped once its components are found
+PLATE_LABELS = {"thali"}
+
+
+# ---------------- CROP PROPOSALS ----------------
+def propose_crops(image, grid=2, overlap=0.2):
+    h, w = image.shape[:2]
+    boxes = [(0, 0, w, h)]
+
+    # Overlapping grid tiles
+    tile_w = int(w / grid * (1 + overlap))
+    tile_h = int(h / grid * (1 + overlap))
+    for row in range(grid):
+        for col in range(grid):
+            x0 = min(int(col * w / grid), w - tile_w)
+            y0 = min(int(row * h / grid), h - tile_h)
+            boxes.append((max(x0, 0), max(y0, 0), min(x0 + tile_w, w), min(y0 + tile_h, h)))
+
+    # Centre crop, where the main item of a combo plate usually sits
+    boxes.append((w // 4, h // 4, w - w // 4, h - h // 4))
+
+    return [(box, image[box[1]:box[3], box[0]:box[2]]) for box in boxes]
+
+
+# ---------------- MULTI-FOOD DETECTION ----------------
+# All crops go to the classifier together, so they run as one batch.
+
+def detect_foods(classifier, image, min_confidence=35.0, max_foods=4, grid=2):
+    crops = propose_crops(np.asarray(image), grid=grid)
+    probs = classifier.predict([crop for _, crop in crops])
+
+    found = {}
+    for (box, _), region_probs in zip(crops, probs):
+        index = int(np.argmax(region_probs))
+        food = classifier.class_names[index]
+        confidence = float(region_probs[index] * 100)
+
+        if confidence < min_confidence:
+            continue
+
+        entry = found.setdefault(food, {"food": food, "confidence": 0.0, "regions": []})
+        entry["confidence"] = max(entry["confidence"], confidence)
+        entry["regions"].append(box)
+
+    components = [food for food in found if food not in PLATE_LABELS]
+    if len(components) >= 2:
+        for food in PLATE_LABELS:
+            found.pop(food, None)
+
+    # Nothing confident: fall back to the whole-frame prediction
+    if not found:
+        index = int(np.argmax(probs[0]))
+        food = classifier.class_names[index]
+        found[food] = {
+            "food": food,
+            "confidence": float(probs[0][index] * 100),
+            "regions": [crops[0][0]],
+        }
+
+    foods = sorted(found.values(), key=lambda f: f["confidence"], reverse=True)
+    return foods[:max_foods]
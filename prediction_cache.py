@@ -0,0 +1,51 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# ---------------- CONTENT-ADDRESSED PREDICTION CACHE ----------------
+# Results are keyed by a hash of the decoded pixels plus the model version,
+# so re-uploads, reruns and camera retakes of the same photo skip the CNN.
+
+def image_key(image, model_version):
+    h = hashlib.sha256()
+    h.update(model_version.encode("utf-8"))
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode("utf-8"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,20 @@
+# ---------------- PROCESS MEMORY (Linux /proc) ----------------
+# Shared by the benchmarks: current/peak resident set size of this process.
+
+def status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    return status_kb("VmRSS")
+
+
+def peak_rss_mb():
+    return status_kb("VmHWM") / 1024
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+from inference_backends import TFLiteBackend
+from model_utils import list_labeled_images, load_image_array, preprocess_image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "food_category_model.keras")
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+
+VARIANTS = ("dynamic", "float16", "int8")
+
+
+# ---------------- DATA ----------------
+def split_samples(samples, holdout_fraction, seed):
+    samples = list(samples)
+    random.Random(seed).shuffle(samples)
+    n_holdout = max(1, int(len(samples) * holdout_fraction)) if samples else 0
+    return samples[n_holdout:], samples[:n_holdout]
+
+
+def load_batch(samples):
+    return np.concatenate([
+        preprocess_image(load_image_array(path))
+        for path, _ in samples
+    ])
+
+
+# ---------------- CONVERSION ----------------
+def convert(model, variant, calibration_samples):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+
+    elif variant == "int8":
+        if not calibration_samples:
+            raise ValueError("int8 conversion needs calibration images")
+
+        def representative_dataset():
+            for path, _ in calibration_samples:
+                yield [preprocess_image(load_image_array(path))]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    return converter.convert()
+
+
+# ---------------- ACCURACY GATE ----------------
+def agreement(reference, candidate):
+    ref_top1 = reference.argmax(axis=1)
+    cand_top1 = candidate.argmax(axis=1)
+    cand_top3 = np.argsort(candidate, axis=1)[:, -3:]
+
+    return {
+        "top1_agreement": float(np.mean(ref_top1 == cand_top1)),
+        "top3_agreement": float(np.mean([
+            ref in top3 for ref, top3 in zip(ref_top1, cand_top3)
+        ])),
+    }
+
+
+def write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the food classifier to quantized TFLite variants "
+                    "and publish only those that agree with the Keras model."
+    )
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--data", default=DATASET_DIR)
+    parser.add_argument("--out-dir", default=BASE_DIR)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--holdout-fraction", type=float, default=0.2)
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--min-top1", type=float, default=0.98)
+    parser.add_argument("--min-top3", type=float, default=0.99)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    samples = list_labeled_images(args.data)
+    if len(samples) < 2:
+        print(f"Need at least 2 images under {args.data} to calibrate and evaluate.")
+        return 1
+
+    calibration, holdout = split_samples(samples, args.holdout_fraction, args.seed)
+    calibration = calibration[:args.calibration_size]
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    holdout_batch = load_batch(holdout)
+    reference = model.predict(holdout_batch, verbose=0)
+
+    print(f"Calibration images: {len(calibration)} | held-out images: {len(holdout)}")
+
+    report = {"model": args.model, "holdout_images": len(holdout), "variants": {}}
+    refused = []
+
+    for variant in args.variants:
+        tflite_bytes = convert(model, variant, calibration)
+
+        with tempfile.NamedTemporaryFile(suffix=".tflite", delete=False) as tmp:
+            tmp.write(tflite_bytes)
+        try:
+            candidate = TFLiteBackend(tmp.name).predict(holdout_batch)
+        finally:
+            os.remove(tmp.name)
+
+        scores = agreement(reference, candidate)
+        passed = scores["top1_agreement"] >= args.min_top1 and \
+            scores["top3_agreement"] >= args.min_top3
+
+        out_path = os.path.join(args.out_dir, f"food_category_model_{variant}.tflite")
+        if passed:
+            write_atomic(out_path, tflite_bytes)
+        else:
+            refused.append(variant)
+
+        report["variants"][variant] = {
+            **scores,
+            "size_bytes": len(tflite_bytes),
+            "published": passed,
+            "path": out_path if passed else None,
+        }
+
+        status = "PUBLISHED" if passed else "REFUSED"
+        print(
+            f"{variant:>8}: top-1 {scores['top1_agreement']:.3f} | "
+            f"top-3 {scores['top3_agreement']:.3f} | "
+            f"{len(tflite_bytes) / 1e6:.1f} MB -> {status}"
+        )
+
+    report_path = os.path.join(args.out_dir, "tflite_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    return 1 if refused else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from embeddings import EmbeddingCache, split_head
+from inference_backends import KERAS_MODEL_PATH
+from model_registry import register, set_candidate
+from model_utils import list_labeled_images, model_version
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+LABELS_PATH = os.path.join(BASE_DIR, "class_labels.json")
+CALORIES_PATH = os.path.join(BASE_DIR, "food_calories.csv")
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+
+# ---------------- LABEL SET ----------------
+def build_label_index(current_labels, sample_labels, calorie_categories):
+    # Spell every label exactly as food_calories.csv does so the Analyze Food
+    # lookup always finds it; existing classes keep their output index
+    by_lower = {c.lower(): c for c in calorie_categories}
+
+    labels = []
+    for name in current_labels + sorted(set(sample_labels)):
+        category = by_lower.get(name.lower())
+        if category is None:
+            print(f"Skipping '{name}': not in food_calories.csv")
+            continue
+        if category not in labels:
+            labels.append(category)
+
+    return labels
+
+
+def next_version(models_dir):
+    versions = [
+        int(m.group(1)) for m in (
+            re.match(r"food_category_model_v(\d+)\.keras$", name)
+            for name in (os.listdir(models_dir) if os.path.isdir(models_dir) else [])
+        ) if m
+    ]
+    return max(versions, default=0) + 1
+
+
+# ---------------- HEAD TRAINING ----------------
+def stratified_split(y, val_fraction=0.1, seed=0):
+    # Samples arrive sorted by label, so hold out a share of every class
+    # rather than the tail; classes with a single image stay in training
+    rng = np.random.default_rng(seed)
+    train_idx, val_idx = [], []
+    for label in np.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == label))
+        n_val = max(1, int(round(len(idx) * val_fraction))) if len(idx) >= 2 else 0
+        val_idx.extend(idx[:n_val])
+        train_idx.extend(idx[n_val:])
+    return rng.permutation(train_idx), np.array(val_idx, dtype=int)
+
+
+def train_head(old_head, old_labels, new_labels, x, y, epochs, learning_rate):
+    import tensorflow as tf
+
+    head = tf.keras.layers.Dense(len(new_labels), activation="softmax", name="food_head")
+    head.build((None, x.shape[1]))
+
+    # Start from the current head so classes with few user images keep what
+    # the original training taught them
+    kernel, bias = head.get_weights()
+    old_kernel, old_bias = old_head.get_weights()
+    old_index = {name.lower(): i for i, name in enumerate(old_labels)}
+    for j, name in enumerate(new_labels):
+        i = old_index.get(name.lower())
+        if i is not None:
+            kernel[:, j] = old_kernel[:, i]
+            bias[j] = old_bias[i]
+    head.set_weights([kernel, bias])
+
+    inputs = tf.keras.Input(shape=(x.shape[1],))
+    trainer = tf.keras.Model(inputs, head(inputs))
+    trainer.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate),
+        loss="sparse_categorical_crossentropy",
+        metrics=["accuracy"]
+    )
+    train_idx, val_idx = stratified_split(y) if len(x) >= 20 else (np.arange(len(x)), [])
+    history = trainer.fit(
+        x[train_idx], y[train_idx],
+        epochs=epochs,
+        batch_size=64,
+        validation_data=(x[val_idx], y[val_idx]) if len(val_idx) else None,
+        shuffle=True,
+        verbose=2
+    )
+    return head, history.history
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Retrain the classifier head on collected images using cached backbone embeddings."
+    )
+    parser.add_argument("--model", default=KERAS_MODEL_PATH)
+    parser.add_argument("--labels", default=LABELS_PATH)
+    parser.add_argument("--data", nargs="+", default=[DATASET_DIR],
+                        help="labeled folders; add the original training set to limit forgetting")
+    parser.add_argument("--out-dir", default=MODELS_DIR)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--register", action="store_true",
+                        help="add the result to the model registry as the shadow candidate")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    samples = [s for root in args.data for s in list_labeled_images(root)]
+    if not samples:
+        print("No labeled images found; nothing to train on.")
+        return 1
+
+    with open(args.labels, "r") as f:
+        class_indices = json.load(f)
+    old_labels = sorted(class_indices, key=class_indices.get)
+    calorie_categories = pd.read_csv(CALORIES_PATH)["category"].tolist()
+    new_labels = build_label_index(old_labels, [label for _, label in samples], calorie_categories)
+    label_ids = {name.lower(): i for i, name in enumerate(new_labels)}
+
+    samples = [(path, label) for path, label in samples if label.lower() in label_ids]
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    backbone, old_head = split_head(model)
+    cache = EmbeddingCache(model_version(args.model))
+
+    start = time.perf_counter()
+    x, computed = cache.embed_paths(backbone, [path for path, _ in samples], args.batch_size)
+    y = np.array([label_ids[label.lower()] for _, label in samples])
+    print(
+        f"Embeddings: {len(samples)} images, {computed} new through the backbone "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
+
+    head, history = train_head(old_head, old_labels, new_labels, x, y, args.epochs, args.learning_rate)
+
+    # Backbone + new head as one deployable model
+    outputs = head(backbone.output)
+    retrained = tf.keras.Model(backbone.inputs, outputs, name="food_classifier")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    version = next_version(args.out_dir)
+    model_path = os.path.join(args.out_dir, f"food_category_model_v{version}.keras")
+    labels_path = os.path.join(args.out_dir, f"class_labels_v{version}.json")
+
+    retrained.save(model_path)
+    with open(labels_path, "w") as f:
+        json.dump({name: i for i, name in enumerate(new_labels)}, f, indent=4)
+
+    print(f"Final train accuracy: {history['accuracy'][-1]:.3f}")
+    if "val_accuracy" in history:
+        print(f"Final validation accuracy: {history['val_accuracy'][-1]:.3f}")
+    print(f"Saved {model_path}")
+    print(f"Saved {labels_path}")
+
+    if args.register:
+        registered = register(model_path, labels_path, notes=f"retrain_head v{version}")
+        set_candidate(registered)
+        print(f"Registered {registered} and started shadow evaluation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
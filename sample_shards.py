@@ -0,0 +1,165 @@
+import argparse
+import fcntl
+import glob
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from model_utils import IMG_SIZE, resize_image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARDS_DIR = os.path.join(BASE_DIR, "training_shards")
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+LABELS_PATH = os.path.join(BASE_DIR, "class_labels.json")
+
+MAX_SHARD_BYTES = 256 * 1024 * 1024
+
+# Fixed-size records: a shard is a flat array of these, so readers memory-map
+# it and slice batches straight out of the file with no per-sample decode
+RECORD_DTYPE = np.dtype([
+    ("pixels", np.uint8, (IMG_SIZE, IMG_SIZE, 3)),
+    ("label_id", "<i4"),
+    ("predicted_id", "<i4"),
+    ("confidence", "<f4"),
+    ("timestamp", "<f8"),
+])
+
+
+def shard_paths(root=SHARDS_DIR):
+    return sorted(glob.glob(os.path.join(root, "shard-*.rec")))
+
+
+# ---------------- WRITER ----------------
+class ShardWriter:
+    def __init__(self, root=SHARDS_DIR, max_shard_bytes=MAX_SHARD_BYTES):
+        self.root = root
+        self.max_records = max(1, max_shard_bytes // RECORD_DTYPE.itemsize)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _current_shard(self):
+        paths = shard_paths(self.root)
+        if paths:
+            last = paths[-1]
+            if os.path.getsize(last) // RECORD_DTYPE.itemsize < self.max_records:
+                return last
+            number = int(os.path.basename(last)[6:11]) + 1
+        else:
+            number = 0
+        return os.path.join(self.root, f"shard-{number:05d}.rec")
+
+    def append(self, image, label_id, predicted_id=-1, confidence=0.0, timestamp=None):
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["pixels"] = resize_image(np.asarray(image.convert("RGB")))
+        record["label_id"] = label_id
+        record["predicted_id"] = predicted_id
+        record["confidence"] = confidence
+        record["timestamp"] = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            path = self._current_shard()
+            with open(path, "ab") as f:
+                # Other workers append to the same shard; a record torn by a
+                # crash is cut off first so later records stay aligned
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    size = os.fstat(f.fileno()).st_size
+                    if size % RECORD_DTYPE.itemsize:
+                        f.truncate(size - size % RECORD_DTYPE.itemsize)
+                    f.write(record.tobytes())
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return path
+
+
+# ---------------- READER ----------------
+def open_shard(path):
+    # A record torn by a crash mid-append is ignored (the next append drops it)
+    count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    if not count:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+
+def count_records(root=SHARDS_DIR):
+    return sum(os.path.getsize(p) // RECORD_DTYPE.itemsize for p in shard_paths(root))
+
+
+def iter_batches(root=SHARDS_DIR, batch_size=64, shuffle=False, seed=None):
+    rng = np.random.default_rng(seed)
+    paths = shard_paths(root)
+    if shuffle:
+        rng.shuffle(paths)
+
+    for path in paths:
+        records = open_shard(path)
+        order = np.arange(len(records))
+        if shuffle:
+            rng.shuffle(order)
+            # Sorted within each batch to keep reads mostly sequential
+            for start in range(0, len(order), batch_size):
+                yield records[np.sort(order[start:start + batch_size])]
+        else:
+            for start in range(0, len(records), batch_size):
+                yield records[start:start + batch_size]
+
+
+def as_tf_dataset(root=SHARDS_DIR, batch_size=64, shuffle=False, seed=None):
+    # (uint8 pixels, label_id) batches for model.fit / model.evaluate
+    import tensorflow as tf
+
+    def generator():
+        for batch in iter_batches(root, batch_size, shuffle, seed):
+            yield np.asarray(batch["pixels"]), np.asarray(batch["label_id"])
+
+    return tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec((None, IMG_SIZE, IMG_SIZE, 3), tf.uint8),
+            tf.TensorSpec((None,), tf.int32),
+        )
+    ).prefetch(tf.data.AUTOTUNE)
+
+
+# ---------------- CLI ----------------
+def main():
+    from PIL import Image
+
+    from inference_backends import load_class_names
+    from model_utils import list_labeled_images
+
+    parser = argparse.ArgumentParser(description="Pack or inspect pre-resized training shards.")
+    parser.add_argument("--shards", default=SHARDS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_pack = sub.add_parser("pack", help="pack an image folder laid out like user_added_data/")
+    p_pack.add_argument("--data", default=DATASET_DIR)
+    p_pack.add_argument("--max-shard-mb", type=int, default=MAX_SHARD_BYTES // (1024 * 1024))
+
+    sub.add_parser("stats", help="count records per shard")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        label_ids = {name.lower(): i for i, name in enumerate(load_class_names(LABELS_PATH))}
+        writer = ShardWriter(args.shards, args.max_shard_mb * 1024 * 1024)
+        packed = 0
+        for path, label in list_labeled_images(args.data):
+            with Image.open(path) as image:
+                writer.append(image, label_ids.get(label.lower(), -1), timestamp=os.path.getmtime(path))
+            packed += 1
+        print(f"Packed {packed} images into {args.shards}")
+
+    elif args.command == "stats":
+        for path in shard_paths(args.shards):
+            print(f"{os.path.basename(path)}: {len(open_shard(path))} records")
+        print(f"Total: {count_records(args.shards)} records")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
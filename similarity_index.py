@@ -0,0 +1,257 @@
+import argparse
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(BASE_DIR, "similarity_index")
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+
+INDEX_DIM = 128
+
+
+# ---------------- EMBEDDING SIMILARITY INDEX ----------------
+# Backbone embeddings are reduced with a fixed Gaussian random projection to
+# INDEX_DIM floats (approximately preserving cosine similarity), normalised,
+# and appended to a flat float32 file that is memory-mapped for queries.
+# 100k images = ~50 MB and one BLAS matrix-vector product per query.
+
+class SimilarityIndex:
+    def __init__(self, root=INDEX_DIR, dim=INDEX_DIM, seed=0):
+        self.root = root
+        self.dim = dim
+        self.seed = seed
+        self.vectors_path = os.path.join(root, "vectors.f32")
+        self.meta_path = os.path.join(root, "meta.jsonl")
+        self.projection_path = os.path.join(root, "projection.npy")
+        self.lock_path = os.path.join(root, ".lock")
+
+        self._lock = threading.Lock()
+        self._projection = None
+        self._vectors = None
+        self._meta = []
+        self._meta_offset = 0
+        os.makedirs(root, exist_ok=True)
+
+    def __len__(self):
+        self._refresh()
+        return len(self._meta)
+
+    # ---------- storage ----------
+    def _load_projection(self, input_dim):
+        if self._projection is None:
+            if os.path.exists(self.projection_path):
+                self._projection = np.load(self.projection_path)
+            else:
+                rng = np.random.default_rng(self.seed)
+                projection = rng.standard_normal((input_dim, self.dim)).astype("float32")
+                projection /= np.sqrt(self.dim)
+                np.save(self.projection_path, projection)
+                self._projection = projection
+        return self._projection
+
+    def _refresh(self):
+        # Pick up rows appended by this or another worker process; only the
+        # new tail of meta.jsonl is read
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "rb") as f:
+                f.seek(self._meta_offset)
+                for line in iter(f.readline, b""):
+                    if not line.endswith(b"\n"):
+                        break
+                    self._meta.append(json.loads(line))
+                    self._meta_offset += len(line)
+
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dim) \
+            if os.path.exists(self.vectors_path) else 0
+        rows = min(rows, len(self._meta))
+
+        if self._vectors is not None and len(self._vectors) == rows:
+            return
+
+        self._vectors = np.memmap(
+            self.vectors_path, dtype="float32", mode="r", shape=(rows, self.dim)
+        ) if rows else np.zeros((0, self.dim), dtype="float32")
+
+    def _align_files(self):
+        # Under the file lock: cut a torn metadata line and any vectors
+        # without metadata, so the next rows append in step
+        self._refresh()
+        if os.path.exists(self.meta_path) and os.path.getsize(self.meta_path) > self._meta_offset:
+            os.truncate(self.meta_path, self._meta_offset)
+
+        row_bytes = 4 * self.dim
+        if os.path.exists(self.vectors_path) and \
+                os.path.getsize(self.vectors_path) != len(self._meta) * row_bytes:
+            os.truncate(self.vectors_path, len(self._meta) * row_bytes)
+
+    def indexed_paths(self):
+        with self._lock:
+            self._refresh()
+            return {meta.get("path") for meta in self._meta}
+
+    def project(self, embeddings):
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype="float32"))
+        reduced = embeddings @ self._load_projection(embeddings.shape[1])
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+    def add(self, embeddings, metas):
+        vectors = self.project(embeddings)
+        # The file lock keeps meta.jsonl and vectors.f32 row-aligned when
+        # several worker processes append at once
+        with self._lock, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._align_files()
+                # Vectors first: a row only becomes visible once its metadata
+                # line is complete, and a crash between the two writes leaves
+                # surplus vectors that the next add() trims
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.astype("float32").tobytes())
+                with open(self.meta_path, "a") as f:
+                    for meta in metas:
+                        f.write(json.dumps(meta) + "\n")
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add_one(self, embedding, meta):
+        self.add([embedding], [meta])
+
+    # ---------- queries ----------
+    def query(self, embedding, k=5, min_similarity=0.0, where=None):
+        with self._lock:
+            self._refresh()
+            vectors, meta = self._vectors, self._meta
+
+        if not len(vectors):
+            return []
+
+        sims = vectors @ self.project(embedding)[0]
+
+        if where is None:
+            n = min(len(sims), k)
+            candidates = np.argpartition(-sims, n - 1)[:n]
+        else:
+            # A filter may reject any number of the best rows: walk every row
+            # above the similarity floor, best first
+            candidates = np.flatnonzero(sims >= min_similarity)
+        candidates = candidates[np.argsort(-sims[candidates])]
+
+        results = []
+        for i in candidates:
+            if sims[i] < min_similarity:
+                break
+            if where is not None and not where(meta[i]):
+                continue
+            results.append((float(sims[i]), meta[i]))
+            if len(results) == k:
+                break
+        return results
+
+    def find_duplicates(self, threshold=0.97, block_size=4096):
+        with self._lock:
+            self._refresh()
+            vectors, meta = self._vectors, self._meta
+
+        # Upper triangle in block_size x block_size tiles: at most one
+        # 64 MB similarity matrix alive at a time, whatever the index size
+        pairs = []
+        for start in range(0, len(vectors), block_size):
+            block = np.asarray(vectors[start:start + block_size])
+            for col in range(start, len(vectors), block_size):
+                sims = block @ np.asarray(vectors[col:col + block_size]).T
+                rows, cols = np.nonzero(sims >= threshold)
+                for r, c in zip(rows, cols):
+                    i, j = start + r, col + c
+                    if j > i:
+                        pairs.append((float(sims[r, c]), meta[i], meta[j]))
+
+        return sorted(pairs, key=lambda p: p[0], reverse=True)
+
+
+# ---------------- CLI ----------------
+def build(index, data_dir, model_path, batch_size):
+    from embeddings import EmbeddingCache, load_backbone
+    from model_utils import list_labeled_images, model_version
+
+    indexed = index.indexed_paths()
+    samples = [s for s in list_labeled_images(data_dir) if s[0] not in indexed]
+    if not samples:
+        print("Index is up to date.")
+        return
+
+    backbone = load_backbone(model_path)
+    cache = EmbeddingCache(model_version(model_path))
+    vectors, computed = cache.embed_paths(backbone, [p for p, _ in samples], batch_size)
+
+    index.add(vectors, [{"path": path, "label": label} for path, label in samples])
+    print(f"Indexed {len(samples)} images ({computed} new embeddings); {len(index)} total.")
+
+
+def main():
+    from inference_backends import KERAS_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Build and query the meal similarity index.")
+    parser.add_argument("--index", default=INDEX_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="add every image under --data not yet indexed")
+    p_build.add_argument("--data", default=DATASET_DIR)
+    p_build.add_argument("--model", default=KERAS_MODEL_PATH)
+    p_build.add_argument("--batch-size", type=int, default=32)
+
+    p_dedup = sub.add_parser("dedup", help="list near-duplicate training images")
+    p_dedup.add_argument("--threshold", type=float, default=0.97)
+
+    p_bench = sub.add_parser("bench", help="time queries against a synthetic index")
+    p_bench.add_argument("--size", type=int, default=100_000)
+    p_bench.add_argument("--input-dim", type=int, default=1280)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(SimilarityIndex(args.index), args.data, args.model, args.batch_size)
+
+    elif args.command == "dedup":
+        pairs = SimilarityIndex(args.index).find_duplicates(args.threshold)
+        for sim, a, b in pairs:
+            print(f"{sim:.3f}  {a.get('path')}  {b.get('path')}")
+        print(f"{len(pairs)} near-duplicate pairs at similarity >= {args.threshold}")
+
+    elif args.command == "bench":
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SimilarityIndex(tmp)
+            rng = np.random.default_rng(1)
+            for start in range(0, args.size, 10_000):
+                n = min(10_000, args.size - start)
+                index.add(
+                    rng.standard_normal((n, args.input_dim)),
+                    [{"path": f"img_{start + i}.jpg"} for i in range(n)]
+                )
+
+            queries = rng.standard_normal((50, args.input_dim))
+            index.query(queries[0])
+            timings = []
+            for q in queries:
+                t = time.perf_counter()
+                index.query(q, k=5)
+                timings.append((time.perf_counter() - t) * 1000)
+
+            print(
+                f"{len(index)} vectors: median {np.median(timings):.2f} ms, "
+                f"p95 {np.percentile(timings, 95):.2f} ms per query"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
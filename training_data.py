@@ -0,0 +1,254 @@
+import argparse
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from PIL import Image
+
+from model_utils import IMAGE_EXTENSIONS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, "user_added_data")
+DB_PATH = os.path.join(BASE_DIR, "users.db")
+
+PHASH_INDEX_NAME = ".phash_index.json"
+PHASH_LOCK_NAME = ".phash_index.lock"
+
+# Hamming distance (out of 64 bits) at or below which two photos are duplicates
+DUPLICATE_MAX_DISTANCE = 4
+
+_lock = threading.Lock()
+
+
+# ---------------- PERCEPTUAL HASH ----------------
+def dhash(image, hash_size=8):
+    # Difference hash: compare neighbouring pixels of a tiny grayscale copy;
+    # robust to re-encoding, resizing and small exposure changes
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+# ---------------- PER-LABEL HASH INDEX ----------------
+def _index_path(label_dir):
+    return os.path.join(label_dir, PHASH_INDEX_NAME)
+
+
+def _load_index(label_dir):
+    path = _index_path(label_dir)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+
+    # First use on an existing folder: hash what is already there
+    index = {"hashes": {}, "skipped": 0, "bytes_saved": 0}
+    for name in sorted(os.listdir(label_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            try:
+                with Image.open(os.path.join(label_dir, name)) as image:
+                    index["hashes"][name] = format(dhash(image), "016x")
+            except OSError:
+                continue
+    return index
+
+
+def _save_index(label_dir, index):
+    path = _index_path(label_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def _label_lock(label_dir):
+    # Serialises load/check/save of one label's index across threads and
+    # across Streamlit worker processes sharing the dataset folder
+    with _lock, open(os.path.join(label_dir, PHASH_LOCK_NAME), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def find_duplicate(index, image_hash, max_distance=DUPLICATE_MAX_DISTANCE):
+    for name, value in index["hashes"].items():
+        if hamming(image_hash, int(value, 16)) <= max_distance:
+            return name
+    return None
+
+
+# ---------------- MANIFEST ----------------
+# Every saved training image gets a row in `training_images`, so counts and
+# per-label histograms are indexed queries instead of directory walks.
+
+def record_training_image(conn, path, label, phash, source=None, username=None,
+                          created_at=None, dataset_dir=DATASET_DIR):
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO training_images
+            (path, label, size_bytes, phash, source, username, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            os.path.relpath(path, dataset_dir),
+            label,
+            os.path.getsize(path),
+            phash,
+            source,
+            username,
+            created_at or datetime.datetime.now().isoformat()
+        ))
+
+
+def reconcile_manifest(conn, dataset_dir=DATASET_DIR):
+    # Rebuild the manifest from disk: add untracked files, drop rows whose
+    # file is gone, refresh sizes; source/username of known files are kept
+    on_disk = {}
+    if os.path.isdir(dataset_dir):
+        for label in sorted(os.listdir(dataset_dir)):
+            label_dir = os.path.join(dataset_dir, label)
+            if not os.path.isdir(label_dir):
+                continue
+            for name in os.listdir(label_dir):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    on_disk[os.path.join(label, name)] = label
+
+    known = {
+        row[0]: row[1]
+        for row in conn.execute("SELECT path, size_bytes FROM training_images")
+    }
+
+    added = removed = updated = 0
+    with conn:
+        for rel_path in set(known) - set(on_disk):
+            conn.execute("DELETE FROM training_images WHERE path=?", (rel_path,))
+            removed += 1
+
+        for rel_path, label in on_disk.items():
+            full_path = os.path.join(dataset_dir, rel_path)
+            size = os.path.getsize(full_path)
+
+            if rel_path in known:
+                if known[rel_path] != size:
+                    conn.execute(
+                        "UPDATE training_images SET size_bytes=? WHERE path=?",
+                        (size, rel_path)
+                    )
+                    updated += 1
+                continue
+
+            try:
+                with Image.open(full_path) as image:
+                    phash = format(dhash(image), "016x")
+            except OSError:
+                phash = None
+
+            conn.execute("""
+                INSERT INTO training_images
+                (path, label, size_bytes, phash, source, username, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                rel_path, label, size, phash, "unknown", None,
+                datetime.datetime.fromtimestamp(os.path.getmtime(full_path)).isoformat()
+            ))
+            added += 1
+
+    return {"added": added, "removed": removed, "updated": updated, "total": len(on_disk)}
+
+
+# ---------------- TRAINING IMAGE WRITE PATH ----------------
+def save_training_image(image, label, conn=None, source=None, username=None,
+                        dataset_dir=DATASET_DIR, max_distance=DUPLICATE_MAX_DISTANCE):
+    label_dir = os.path.join(dataset_dir, label)
+    os.makedirs(label_dir, exist_ok=True)
+
+    image_hash = dhash(image)
+
+    with _label_lock(label_dir):
+        index = _load_index(label_dir)
+        duplicate = find_duplicate(index, image_hash, max_distance)
+
+        if duplicate is not None:
+            # Skip the write; the existing file stands in for this photo
+            duplicate_path = os.path.join(label_dir, duplicate)
+            index["skipped"] += 1
+            if os.path.exists(duplicate_path):
+                index["bytes_saved"] += os.path.getsize(duplicate_path)
+            _save_index(label_dir, index)
+            return {"path": duplicate_path, "saved": False, "duplicate": True}
+
+        name = f"{datetime.datetime.now().timestamp()}.jpg"
+        image_path = os.path.join(label_dir, name)
+        image.save(image_path)
+
+        index["hashes"][name] = format(image_hash, "016x")
+        _save_index(label_dir, index)
+
+    if conn is not None:
+        record_training_image(
+            conn, image_path, label, format(image_hash, "016x"),
+            source=source, username=username, dataset_dir=dataset_dir
+        )
+
+    return {"path": image_path, "saved": True, "duplicate": False}
+
+
+def dedup_stats(dataset_dir=DATASET_DIR):
+    skipped = 0
+    bytes_saved = 0
+
+    if os.path.isdir(dataset_dir):
+        for label in os.listdir(dataset_dir):
+            path = _index_path(os.path.join(dataset_dir, label))
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    index = json.load(f)
+                skipped += index.get("skipped", 0)
+                bytes_saved += index.get("bytes_saved", 0)
+
+    return {"duplicates_skipped": skipped, "bytes_saved": bytes_saved}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the training image manifest.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_reconcile = sub.add_parser("reconcile", help="rebuild the manifest from files on disk")
+    p_reconcile.add_argument("--data", default=DATASET_DIR)
+    p_reconcile.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    from database import init_db
+
+    conn = sqlite3.connect(args.db)
+    init_db(conn.cursor(), conn)
+    try:
+        result = reconcile_manifest(conn, args.data)
+    finally:
+        conn.close()
+
+    print(
+        f"Manifest reconciled: {result['added']} added, {result['removed']} removed, "
+        f"{result['updated']} updated ({result['total']} images on disk)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())